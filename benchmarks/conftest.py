@@ -0,0 +1,123 @@
+"""Бенчмарки страниц yatube.
+
+Запуск из корня репозитория::
+
+    pytest benchmarks
+    BENCH_SIZES=1000,10000 BENCH_OUTPUT=bench.json pytest benchmarks
+
+Для каждого объёма данных база наполняется заново; результаты
+(число запросов, время, пик памяти) пишутся в JSON для сравнения
+между коммитами.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks import factory
+from posts.models import Group, Post, User
+
+SIZES = [int(size) for size in os.getenv('BENCH_SIZES', '100,1000').split(',')]
+REPEAT = int(os.getenv('BENCH_REPEAT', '5'))
+OUTPUT = os.getenv('BENCH_OUTPUT', 'bench_results.json')
+
+RESULTS = []
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@pytest.fixture(scope='module', params=SIZES, ids=lambda size: f'posts={size}')
+def dataset(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        counts = factory.seed(request.param)
+        data = {
+            'size': request.param,
+            'volumes': counts,
+            'author': User.objects.annotate(
+                total=Count('posts')).order_by('-total').first(),
+            'reader': User.objects.annotate(
+                total=Count('follower')).order_by('-total').first(),
+            'group': Group.objects.order_by('-posts_count').first(),
+            'post': Post.objects.order_by('-comments_count', 'pk').first(),
+        }
+    yield data
+
+
+@pytest.fixture(autouse=True)
+def dummy_cache(settings):
+    # Меряем работу страниц, а не попадания в кэш.
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Bench:
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def measure(self, name, func, repeat=REPEAT):
+        func()
+        # Журнал запросов ограничен по длине: после наполнения базы
+        # он полон, и CaptureQueriesContext ничего бы не увидел.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        # Следующие запросы очистят журнал, поэтому считаем сразу.
+        query_count = len(queries)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result = {
+            'name': name,
+            'size': self.dataset['size'],
+            'queries': query_count,
+            'median_ms': round(statistics.median(timings) * 1000, 3),
+            'min_ms': round(min(timings) * 1000, 3),
+            'peak_kb': round(peak / 1024, 1),
+        }
+        RESULTS.append(result)
+        return result
+
+
+@pytest.fixture
+def bench(dataset, db):
+    return Bench(dataset)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not RESULTS:
+        return
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'results': RESULTS,
+    }
+    with open(OUTPUT, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
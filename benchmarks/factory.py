@@ -0,0 +1,84 @@
+"""Быстрое наполнение базы для бенчмарков через ``bulk_create``.
+
+``bulk_create`` не вызывает сигналы, поэтому после загрузки
+ленты подписок и счётчики перестраиваются целиком.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from core.model import explicit_dates
+from posts import feed, search
+from posts.counters import recount
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def volumes(size):
+    """Объёмы данных для ``size`` постов."""
+    users = max(size // 10, 2)
+    return {
+        'users': users,
+        'groups': max(size // 100, 1),
+        'posts': size,
+        'comments': size * 2,
+        'follows': min(users * 5, users * (users - 1)),
+    }
+
+
+def seed(size, seed_value=0):
+    rng = random.Random(seed_value)
+    counts = volumes(size)
+    password = make_password(None)
+    User.objects.bulk_create(
+        [User(username=f'bench{number}', password=password)
+         for number in range(counts['users'])],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    Group.objects.bulk_create(
+        [Group(title=f'Группа {number}', slug=f'group-{number}',
+               description='Группа для бенчмарка')
+         for number in range(counts['groups'])],
+        batch_size=BATCH_SIZE,
+    )
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    start = timezone.now() - timedelta(minutes=counts['posts'])
+    with explicit_dates(Post._meta.get_field('pub_date'),
+                        Comment._meta.get_field('created')):
+        Post.objects.bulk_create(
+            [Post(text=f'Пост {number} ' + 'текст ' * rng.randint(5, 50),
+                  author_id=rng.choice(user_ids),
+                  group_id=rng.choice(group_ids + [None]),
+                  pub_date=start + timedelta(minutes=number))
+             for number in range(counts['posts'])],
+            batch_size=BATCH_SIZE,
+        )
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        Comment.objects.bulk_create(
+            [Comment(post_id=rng.choice(post_ids),
+                     author_id=rng.choice(user_ids),
+                     text=f'Комментарий {number}',
+                     created=start + timedelta(minutes=number))
+             for number in range(counts['comments'])],
+            batch_size=BATCH_SIZE,
+        )
+    pairs = set()
+    while len(pairs) < counts['follows']:
+        user_id, author_id = rng.sample(user_ids, 2)
+        pairs.add((user_id, author_id))
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in sorted(pairs)],
+        batch_size=BATCH_SIZE,
+    )
+    recount()
+    feed.rebuild()
+    search.index_missing()
+    return counts
@@ -0,0 +1,38 @@
+"""Страницы ленты с кэшем шаблонов и без него."""
+import copy
+
+import pytest
+from django.urls import reverse
+
+from benchmarks.test_views import client_for, get
+from core.templates import warm_templates
+
+
+@pytest.fixture(params=[False, True], ids=['uncached', 'cached'])
+def template_cache(request, settings):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    loaders = settings.TEMPLATE_LOADERS
+    templates[0]['OPTIONS']['loaders'] = (
+        [('django.template.loaders.cached.Loader', loaders)]
+        if request.param else loaders)
+    # Замена настройки пересоздаёт движки шаблонов.
+    settings.TEMPLATES = templates
+    if request.param:
+        warm_templates()
+    return 'cached' if request.param else 'uncached'
+
+
+def feed_urls(dataset):
+    return {
+        'index': reverse('posts:index'),
+        'group_posts': reverse(
+            'posts:group_list', args=(dataset['group'].slug,)),
+        'profile': reverse(
+            'posts:profile', args=(dataset['author'].username,)),
+    }
+
+
+def test_feed_templates(bench, dataset, template_cache):
+    for name, url in feed_urls(dataset).items():
+        bench.measure(f'{name}_templates_{template_cache}',
+                      get(client_for(), url))
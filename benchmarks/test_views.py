@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from core.paginator import NEXT, encode_cursor
+from posts.models import Post
+
+
+def deep_cursor(queryset, fraction=0.9):
+    """Курсор страницы на глубине ``fraction`` ленты."""
+    ordered = queryset.order_by('-pub_date', '-pk')
+    depth = int(ordered.count() * fraction)
+    page = depth // settings.PER_PAGE + 1
+    post = ordered[max(depth - 1, 0)]
+    return encode_cursor(NEXT, post, page)
+
+
+def client_for(user=None):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def get(client, url):
+    def request():
+        response = client.get(url)
+        assert response.status_code == 200
+    return request
+
+
+def test_index(bench):
+    url = reverse('posts:index')
+    bench.measure('index', get(client_for(), url))
+
+
+def test_index_deep_cursor(bench):
+    url = reverse('posts:index') + '?cursor=' + deep_cursor(Post.objects)
+    bench.measure('index_deep_cursor', get(client_for(), url))
+
+
+def test_index_deep_offset(bench):
+    count = Post.objects.count()
+    page = int(count * 0.9) // settings.PER_PAGE + 1
+    url = reverse('posts:index') + f'?page={page}'
+    bench.measure('index_deep_offset', get(client_for(), url))
+
+
+def test_group_posts(bench, dataset):
+    url = reverse('posts:group_list', args=(dataset['group'].slug,))
+    bench.measure('group_posts', get(client_for(), url))
+
+
+def test_profile(bench, dataset):
+    url = reverse('posts:profile', args=(dataset['author'].username,))
+    bench.measure('profile', get(client_for(dataset['reader']), url))
+
+
+def test_post_detail(bench, dataset):
+    url = reverse('posts:post_detail', args=(dataset['post'].pk,))
+    bench.measure('post_detail', get(client_for(), url))
+
+
+def test_follow_index(bench, dataset):
+    url = reverse('posts:follow_index')
+    bench.measure('follow_index', get(client_for(dataset['reader']), url))
+
+
+def test_post_create(bench, dataset):
+    client = client_for(dataset['author'])
+    url = reverse('posts:post_create')
+
+    def request():
+        response = client.post(url, {'text': 'Новый пост'})
+        assert response.status_code == 302
+    bench.measure('post_create', request)
+
+
+def test_post_edit(bench, dataset):
+    post = Post.objects.filter(author=dataset['author']).first()
+    client = client_for(dataset['author'])
+    url = reverse('posts:post_edit', args=(post.pk,))
+
+    def request():
+        response = client.post(url, {'text': 'Изменённый текст'})
+        assert response.status_code == 302
+    bench.measure('post_edit', request)
+
+
+def test_add_comment(bench, dataset):
+    client = client_for(dataset['reader'])
+    url = reverse('posts:add_comment', args=(dataset['post'].pk,))
+
+    def request():
+        response = client.post(url, {'text': 'Комментарий'})
+        assert response.status_code == 302
+    bench.measure('add_comment', request)
+
+
+def test_follow_unfollow(bench, dataset):
+    client = client_for(dataset['reader'])
+    author = dataset['author'].username
+    follow = reverse('posts:profile_follow', args=(author,))
+    unfollow = reverse('posts:profile_unfollow', args=(author,))
+
+    def request():
+        client.get(follow)
+        client.get(unfollow)
+    bench.measure('follow_unfollow', request)
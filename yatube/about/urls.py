@@ -1,10 +1,14 @@
 from django.urls import path
 
+from core.http import cache_anonymous
+
 from . import views
 
 app_name = 'about'
 
 urlpatterns = [
-    path('author/', views.AboutAuthorView.as_view(), name='author'),
-    path('tech/', views.AboutTechView.as_view(), name='tech'),
+    path('author/', cache_anonymous()(views.AboutAuthorView.as_view()),
+         name='author'),
+    path('tech/', cache_anonymous()(views.AboutTechView.as_view()),
+         name='tech'),
 ]
@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import Blob, Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'created',)
+    list_filter = ('status', 'name',)
+    readonly_fields = ('error',)
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'references', 'released',)
+    list_filter = ('released',)
+    search_fields = ('name',)
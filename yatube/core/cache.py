@@ -0,0 +1,163 @@
+"""Кэш в отдельном файле SQLite, общий для всех процессов сервера.
+
+Не требует отдельного сервера, как Redis, но в отличие от
+``LocMemCache`` один и тот же ключ виден всем воркерам. Целые числа
+хранятся как есть, поэтому ``incr`` атомарен — на нём держатся
+версии ключей для инвалидации.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB, is_int INTEGER, expires REAL)'
+)
+
+
+class SQLiteCache(BaseCache):
+    CULL_EVERY = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.location, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value, 1
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL), 0
+
+    @staticmethod
+    def _load(value, is_int):
+        return value if is_int else pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self._fetch([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        return self._fetch(list(keys), version)
+
+    def _fetch(self, keys, version):
+        if not keys:
+            return {}
+        names = {self._key(key, version): key for key in keys}
+        placeholders = ','.join('?' * len(names))
+        rows = self.connection.execute(
+            f'SELECT key, value, is_int FROM cache WHERE key IN '
+            f'({placeholders}) AND (expires IS NULL OR expires > ?)',
+            [*names, time.time()],
+        ).fetchall()
+        return {names[name]: self._load(value, is_int)
+                for name, value, is_int in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self._key(key, version), *self._dump(value), expires)
+                for key, value in data.items()]
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows)
+            self._cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        name = self._key(key, version)
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (name, time.time()))
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                (name, *self._dump(value),
+                 self.get_backend_timeout(timeout)))
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()))
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        name = self._key(key, version)
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            row = self.connection.execute(
+                'SELECT value, is_int FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (name, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            if not row[1]:
+                raise TypeError(f"Value of '{key}' is not an integer")
+            self.connection.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ?',
+                (delta, name))
+        return row[0] + delta
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        names = [self._key(key, version) for key in keys]
+        self.connection.executemany(
+            'DELETE FROM cache WHERE key = ?', [(name,) for name in names])
+
+    def has_key(self, key, version=None):
+        return bool(self._fetch([key], version))
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def _cull(self):
+        """Как у встроенных бэкендов: при переполнении удаляем
+        просроченные записи, затем каждую ``cull_frequency``-ю.
+        Размер таблицы проверяется не чаще раза в ``CULL_EVERY`` записей."""
+        self._writes += 1
+        if self._writes % self.CULL_EVERY:
+            return
+        count, = self.connection.execute(
+            'SELECT COUNT(*) FROM cache').fetchone()
+        if count <= self._max_entries:
+            return
+        self.connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        if self._cull_frequency:
+            self.connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,))
+
+    def close(self, **kwargs):
+        # Соединение живёт весь срок потока, как и у LocMemCache.
+        pass
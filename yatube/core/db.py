@@ -0,0 +1,120 @@
+"""Чтение с реплик базы.
+
+Реплики перечислены в ``settings.DATABASE_REPLICAS``. Представления,
+обёрнутые в ``read_from_replicas``, читают со случайной живой реплики;
+всё остальное, все записи и транзакции идут на основную базу.
+После записи запрос до конца читает с основной базы, а
+``PrimaryPinMiddleware`` ещё ``DATABASE_PIN_SECONDS`` секунд
+отправляет туда запросы того же посетителя, чтобы он увидел
+свои изменения, пока реплики догоняют.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_state = threading.local()
+_health = {}
+
+
+def check_connection(alias):
+    """Проверяет, что база отвечает и на ней есть схема."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+        return True
+    except DatabaseError:
+        connections[alias].close()
+        return False
+
+
+def is_healthy(alias):
+    """Результат ``check_connection`` запоминается на
+    ``DATABASE_HEALTH_CHECK_INTERVAL`` секунд."""
+    healthy, checked = _health.get(alias, (None, 0))
+    if time.monotonic() - checked >= settings.DATABASE_HEALTH_CHECK_INTERVAL:
+        healthy = check_connection(alias)
+        _health[alias] = healthy, time.monotonic()
+    return healthy
+
+
+def healthy_replicas():
+    return [alias for alias in settings.DATABASE_REPLICAS
+            if is_healthy(alias)]
+
+
+def pin_primary(pinned=True):
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+@contextmanager
+def primary_reads():
+    """Внутри блока все чтения идут на основную базу."""
+    pinned = getattr(_state, 'pinned', False)
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = pinned
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def read_from_replicas(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        _state.replicas = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replicas = False
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not getattr(_state, 'replicas', False)
+                or getattr(_state, 'pinned', False) or has_written()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и на основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryPinMiddleware:
+    """Запоминает запись посетителя в cookie ``DATABASE_PIN_COOKIE``."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        pin_primary(settings.DATABASE_PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if has_written():
+                response.set_cookie(
+                    settings.DATABASE_PIN_COOKIE, '1',
+                    max_age=settings.DATABASE_PIN_SECONDS, httponly=True)
+            return response
+        finally:
+            pin_primary(False)
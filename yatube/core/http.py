@@ -0,0 +1,114 @@
+"""Условные ответы и кэш страниц.
+
+``conditional`` строит ``ETag`` и ``Last-Modified`` для
+``django.views.decorators.http.condition`` из одной функции
+``validators``, поэтому оба значения берутся одним запросом к базе.
+``cache_anonymous`` отдаёт анонимным посетителям готовую страницу
+из кэша, не обращаясь к базе и шаблонам.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from .db import primary_reads
+from .stampede import single_flight
+
+
+def conditional(validators):
+    """``validators(request, *args, **kwargs)`` возвращает пару
+    (значения, от которых зависит страница; время последнего изменения)
+    или ``None``, если страницы нет. Страница зависит и от пользователя:
+    его id входит в ``ETag``, а ответ получает ``Vary: Cookie``. Вошедшему
+    пользователю в ``ETag`` добавляется и csrf-cookie: формы страницы
+    несут токен, и после его смены при входе старая копия их сломает."""
+    def computed(request, *args, **kwargs):
+        if not hasattr(request, '_validators'):
+            request._validators = validators(request, *args, **kwargs)
+        return request._validators
+
+    def etag(request, *args, **kwargs):
+        found = computed(request, *args, **kwargs)
+        if found is None:
+            return None
+        user = request.user.pk
+        if user is not None:
+            user = user, request.META.get('CSRF_COOKIE')
+        parts = repr((user, *found[0])).encode()
+        return hashlib.md5(parts).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        found = computed(request, *args, **kwargs)
+        return found and found[1]
+
+    def decorator(view):
+        return vary_on_cookie(condition(
+            etag_func=etag, last_modified_func=last_modified)(view))
+    return decorator
+
+
+def page_cache_key(request, versions):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    location = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return 'pages:{}:{}'.format(
+        location, ':'.join(str(version) for version in versions))
+
+
+def cacheable(request, response):
+    # Страница с csrf-токеном или cookie принадлежит одному посетителю.
+    return (response.status_code == 200 and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED'))
+
+
+def render(response):
+    # TemplateResponse нужно отрисовать, прежде чем класть в кэш.
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    return response
+
+
+def cache_anonymous(versions=None, timeout=None):
+    """Кэширует страницу целиком для анонимных GET-запросов.
+
+    ``versions(request, *args, **kwargs)`` возвращает версии данных,
+    из которых собрана страница; они входят в ключ вместе с путём
+    и параметрами запроса, поэтому после изменения данных страница
+    просто собирается заново. Вошедшие пользователи кэш не используют:
+    у них свои шапка и кнопки подписки.
+
+    Страница для кэша собирается по основной базе: реплика может
+    ещё не получить изменение, после которого сменилась версия, и
+    устаревшая страница пролежала бы под новым ключом весь срок."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            key = page_cache_key(
+                request, versions(request, *args, **kwargs)
+                if versions else ())
+            response = cache.get(key)
+            if response is None:
+                def store(response):
+                    if cacheable(request, response):
+                        cache.set(key, response,
+                                  timeout or settings.PAGE_CACHE_TIMEOUT)
+
+                def compute():
+                    with primary_reads():
+                        return render(view(request, *args, **kwargs))
+                response = single_flight(key, compute, store)
+            return get_conditional_response(
+                request, etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    response.get('Last-Modified', '')),
+                response=response)
+        return wrapper
+    return decorator
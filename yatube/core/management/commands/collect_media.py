@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.storage import collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы хранилища с адресацией по содержимому, '
+            'на которые не ссылается ни одна запись, и их миниатюры')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=settings.MEDIA_GC_GRACE,
+            help='Сколько секунд файл без ссылок ещё хранится')
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Сначала пересчитать ссылки по данным моделей')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, которые будут удалены')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            recount_references()
+        removed = collect_garbage(options['grace'], options['dry_run'])
+        for name in removed:
+            self.stdout.write(name)
+        self.stdout.write(f'Файлов без ссылок: {len(removed)}')
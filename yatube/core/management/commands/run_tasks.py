@@ -0,0 +1,45 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import Task
+from core.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди core.Task'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь один раз и выйти')
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунды')
+        parser.add_argument(
+            '--cleanup', action='store_true',
+            help='Удалить выполненные задачи после разбора')
+
+    def purge_sessions(self):
+        # То же, что clearsessions, но без отдельного расписания.
+        import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+        self.purged = time.monotonic()
+
+    def handle(self, *args, **options):
+        self.purge_sessions()
+        while True:
+            if (time.monotonic() - self.purged
+                    >= settings.SESSION_PURGE_INTERVAL):
+                self.purge_sessions()
+            processed = run_pending(options['batch'])
+            if processed:
+                self.stdout.write(f'Обработано задач: {processed}')
+            if options['cleanup']:
+                Task.objects.filter(status=Task.DONE).delete()
+            if not processed:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
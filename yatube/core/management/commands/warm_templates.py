@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateSyntaxError
+
+from core.templates import warm_templates
+
+
+class Command(BaseCommand):
+    help = 'Компилирует все шаблоны проекта и проверяет, что они собираются'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--app-dirs', action='store_true',
+            help='Также шаблоны из папок templates приложений')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            warmed = warm_templates(app_dirs=options['app_dirs'])
+        except TemplateSyntaxError as error:
+            raise CommandError(f'Шаблон не собирается: {error}')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'Шаблонов: {len(warmed)} за {elapsed * 1000:.0f} мс')
+        if not settings.TEMPLATE_CACHE:
+            self.stdout.write(
+                'TEMPLATE_CACHE выключен: шаблоны не остаются в памяти')
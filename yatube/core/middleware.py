@@ -0,0 +1,178 @@
+"""Метрики запроса: SQL, шаблоны и кэш.
+
+Для доли запросов ``REQUEST_METRICS_SAMPLE_RATE`` middleware считает
+число и время SQL-запросов, самые медленные из них, время рендеринга
+шаблонов и попадания в кэш. Результат уходит в заголовок
+``Server-Timing`` и одной JSON-строкой в лог ``core.metrics``.
+При нулевой доле middleware отключается целиком.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('core.metrics')
+
+_local = threading.local()
+_installed = False
+_MISSING = object()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest = []
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_query(self, sql, duration, limit):
+        self.queries += 1
+        self.sql_time += duration
+        self.slowest.append((duration, sql))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[limit:]
+
+
+def current_metrics():
+    return getattr(_local, 'metrics', None)
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        metrics = current_metrics()
+        if metrics is None:
+            return render(self, context)
+        # Вложенные шаблоны (include, extends) уже входят во внешний.
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+    return wrapper
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, _MISSING, version=version)
+        metrics = current_metrics()
+        if metrics is not None:
+            if value is _MISSING:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return default if value is _MISSING else value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        found = get_many(self, keys, version=version)
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def install_hooks():
+    """Оборачивает рендеринг шаблонов и чтение кэша один раз за процесс."""
+    global _installed
+    if _installed:
+        return
+    Template.render = _timed_render(Template.render)
+    patched = set()
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if backend in patched:
+            continue
+        # Базовый get_many вызывает get, считать его второй раз не нужно.
+        if backend.get is not BaseCache.get:
+            backend.get = _counted_get(backend.get)
+        if backend.get_many is not BaseCache.get_many:
+            backend.get_many = _counted_get_many(backend.get_many)
+        patched.add(backend)
+    _installed = True
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        self.slow_queries = settings.REQUEST_METRICS_SLOW_QUERIES
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        install_hooks()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        metrics = _local.metrics = RequestMetrics()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(self.query_wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total = time.perf_counter() - start
+        response['Server-Timing'] = self.server_timing(metrics, total)
+        logger.info(json.dumps(
+            self.log_record(request, response, metrics, total),
+            ensure_ascii=False))
+        return response
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            _local.metrics.record_query(
+                sql, time.perf_counter() - start, self.slow_queries)
+
+    @staticmethod
+    def server_timing(metrics, total):
+        return ', '.join((
+            f'db;dur={metrics.sql_time * 1000:.1f};'
+            f'desc="{metrics.queries} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'cache;desc="{metrics.cache_hits} hits '
+            f'{metrics.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+    @staticmethod
+    def log_record(request, response, metrics, total):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(metrics.sql_time * 1000, 2),
+            'queries': metrics.queries,
+            'slowest': [
+                {'ms': round(duration * 1000, 2), 'sql': sql[:300]}
+                for duration, sql in metrics.slowest
+            ],
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+        }
@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 from django.db import models
 
 
@@ -11,3 +13,16 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Позволяет сохранить свои даты в полях с ``auto_now_add``,
+    например при массовой загрузке через ``bulk_create``."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
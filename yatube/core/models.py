@@ -0,0 +1,61 @@
+from django.db import models
+from django.utils import timezone
+
+from .model import CreatedModel
+
+
+class Task(CreatedModel):
+    """Отложенная задача для фонового воркера ``run_tasks``."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы', default='{}')
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    claimed_at = models.DateTimeField('Взята в работу', null=True,
+                                      blank=True)
+    error = models.TextField('Ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='task_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
+class Blob(models.Model):
+    """Файл хранилища с адресацией по содержимому и счётчик ссылок
+    на него из полей моделей."""
+    name = models.CharField('Файл', max_length=255, primary_key=True)
+    references = models.IntegerField('Ссылок', default=0)
+    released = models.DateTimeField(
+        'Без ссылок с', null=True, blank=True, default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+        indexes = [
+            models.Index(fields=['references', 'released'],
+                         name='blob_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
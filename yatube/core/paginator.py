@@ -0,0 +1,167 @@
+import base64
+import json
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+# Больше не влезает в целое базы данных (sqlite3 бросит OverflowError).
+MAX_INT = 2 ** 63 - 1
+
+
+def encode_cursor(direction, obj, number, field='pub_date', tiebreak='pk'):
+    """Упаковывает позицию (значение поля, id) в непрозрачный токен.
+    Поле — дата или число, например ранг поисковой выдачи."""
+    value = getattr(obj, field)
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    payload = [direction, value, getattr(obj, tiebreak), number]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, numeric=False):
+    """Распаковывает токен; при любой ошибке возвращает None.
+    ``numeric`` — значение поля число, иначе дата."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, value, pk, number = json.loads(raw.decode())
+        if numeric:
+            if (not isinstance(value, (int, float))
+                    or isinstance(value, bool)
+                    or isinstance(value, int) and abs(value) > MAX_INT):
+                value = None
+        else:
+            value = parse_datetime(value) if isinstance(value, str) else None
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or value is None:
+        return None
+    if not isinstance(pk, int) or not isinstance(number, int):
+        return None
+    if not (-MAX_INT <= pk <= MAX_INT and number <= MAX_INT):
+        return None
+    return direction, value, pk, max(number, 1)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинатор по паре (pub_date, id).
+
+    Страница выбирается условием ``(pub_date, id) < (курсор)`` вместо
+    ``OFFSET``, поэтому её стоимость не зависит от глубины ленты,
+    а ``COUNT(*)`` не выполняется вовсе. Возвращает обычные ``Page``
+    с дополнительными атрибутами ``cursor``, ``next_cursor``
+    и ``previous_cursor`` для шаблона паджинатора.
+
+    ``tiebreak`` — уникальное поле для равных ``field``; ``transform``
+    превращает строки выборки в объекты страницы (например, элементы
+    ленты в посты); ``descending=False`` листает по возрастанию ``field``;
+    ``numeric=True`` — ``field`` число, а не дата.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date',
+                 tiebreak='pk', transform=None, descending=True,
+                 numeric=False, approximate_count=False, count_limit=1000):
+        self.field = field
+        self.numeric = numeric
+        self.tiebreak = tiebreak
+        self.transform = transform
+        self.descending = descending
+        self.approximate_count = approximate_count
+        self.count_limit = count_limit
+        self._num_pages = None
+        sign = '-' if descending else ''
+        super().__init__(
+            object_list.order_by(f'{sign}{field}', f'{sign}{tiebreak}'),
+            per_page)
+
+    @cached_property
+    def count(self):
+        """Точное число объектов или, в приблизительном режиме, не больше
+        ``count_limit``: ``COUNT(*)`` над подзапросом с ``LIMIT``."""
+        if self.approximate_count:
+            return self.object_list[:self.count_limit].count()
+        return super().count
+
+    @property
+    def num_pages(self):
+        if self._num_pages is not None:
+            return self._num_pages
+        return super().num_pages
+
+    def _seek(self, direction, value, pk):
+        field, tiebreak = self.field, self.tiebreak
+        forward = (direction == NEXT) == self.descending
+        lookup = 'lt' if forward else 'gt'
+        condition = (Q(**{f'{field}__{lookup}': value})
+                     | Q(**{field: value, f'{tiebreak}__{lookup}': pk}))
+        queryset = self.object_list.filter(condition)
+        if direction == NEXT:
+            return queryset
+        return queryset.reverse()
+
+    def _build_page(self, rows, number, has_next, cursor=None):
+        # Без COUNT(*) известно лишь, есть ли страница дальше текущей.
+        self._num_pages = number + 1 if has_next else number
+        object_list = self.transform(rows) if self.transform else rows
+        page = Page(object_list, number, self)
+        page.cursor = cursor
+        page.next_cursor = None
+        page.previous_cursor = None
+        if rows and has_next:
+            page.next_cursor = encode_cursor(
+                NEXT, rows[-1], number + 1, self.field, self.tiebreak)
+        if rows and number > 1:
+            page.previous_cursor = encode_cursor(
+                PREVIOUS, rows[0], number - 1, self.field, self.tiebreak)
+        return page
+
+    def first_page(self):
+        rows = list(self.object_list[:self.per_page + 1])
+        return self._build_page(
+            rows[:self.per_page], 1, len(rows) > self.per_page)
+
+    def cursor_page(self, token):
+        position = decode_cursor(token, self.numeric)
+        if position is None:
+            return self.first_page()
+        direction, value, pk, number = position
+        rows = list(self._seek(direction, value, pk)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == NEXT:
+            return self._build_page(rows, number, has_more, token)
+        if not has_more:
+            # Дошли до начала ленты: это первая страница,
+            # даже если номер в курсоре устарел.
+            return self.first_page()
+        return self._build_page(rows[::-1], number, True, token)
+
+    def number_page(self, number):
+        """Совместимость со старыми ссылками ``?page=N`` (через OFFSET)."""
+        if number <= 1:
+            return self.first_page()
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows:
+            # Как Paginator.get_page: за концом ленты — последняя страница.
+            return self.number_page(min(super().num_pages, number - 1))
+        return self._build_page(
+            rows[:self.per_page], number, len(rows) > self.per_page)
+
+    def get_page_for(self, request, param='cursor', page_param='page'):
+        cursor = request.GET.get(param)
+        if cursor:
+            return self.cursor_page(cursor)
+        number = page_param and request.GET.get(page_param)
+        if number:
+            try:
+                number = int(number)
+            except ValueError:
+                number = 0
+            if number * self.per_page <= MAX_INT:
+                return self.number_page(number)
+        return self.first_page()
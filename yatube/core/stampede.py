@@ -0,0 +1,94 @@
+"""Защита кэша от одновременного пересчёта.
+
+Когда популярный ключ истекает, его пересчитывают сразу все процессы.
+``get_or_compute`` хранит вместе со значением мягкий срок и время
+пересчёта:
+
+* после мягкого срока значение ещё ``CACHE_STALE_TIMEOUT`` секунд
+  лежит в кэше; его пересчитывает один процесс, взявший блокировку,
+  а остальные тем временем отдают устаревшее значение;
+* незадолго до мягкого срока ключ с небольшой вероятностью
+  пересчитывается заранее (probabilistic early expiration), и тем
+  раньше, чем дольше он считается, — обычно до истечения не доходит;
+* если значения нет совсем, считает один процесс, остальные ждут
+  его результат (``single_flight``).
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def single_flight(key, compute, store):
+    """Пересчитывает значение ключа только в одном процессе.
+
+    Остальные ждут, пока он положит результат в кэш, а если он
+    ничего не положил (значение не кэшируется или процесс упал) —
+    считают сами, но кэш не трогают."""
+    lock = lock_key(key)
+    lock_timeout = settings.CACHE_LOCK_TIMEOUT
+    if cache.add(lock, 1, lock_timeout):
+        try:
+            value = compute()
+            store(value)
+            return value
+        finally:
+            cache.delete(lock)
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(settings.CACHE_POLL_INTERVAL)
+        found = cache.get_many([key, lock])
+        if key in found:
+            return found[key]
+        if lock not in found:
+            break
+    return compute()
+
+
+def expires_early(expires, delta, beta):
+    """Решает, пора ли пересчитать значение со сроком ``expires``,
+    которое считалось ``delta`` секунд."""
+    if expires is None:
+        return False
+    return time.time() - delta * beta * math.log(random.random()) >= expires
+
+
+def get_or_compute(key, compute, timeout, beta=None):
+    """Значение ключа из кэша или ``compute()``; ``timeout`` — мягкий
+    срок в секундах, ``None`` — бессрочно."""
+    if beta is None:
+        beta = settings.CACHE_EARLY_EXPIRATION_BETA
+
+    def computed():
+        start = time.time()
+        value = compute()
+        finished = time.time()
+        expires = None if timeout is None else finished + timeout
+        return value, expires, finished - start
+
+    def store(entry):
+        cache.set(key, entry, None if timeout is None
+                  else timeout + settings.CACHE_STALE_TIMEOUT)
+
+    entry = cache.get(key)
+    if entry is None:
+        return single_flight(key, computed, store)[0]
+    value, expires, delta = entry
+    if not expires_early(expires, delta, beta):
+        return value
+    lock = lock_key(key)
+    if not cache.add(lock, 1, settings.CACHE_LOCK_TIMEOUT):
+        # Значение уже пересчитывает другой процесс.
+        return value
+    try:
+        entry = computed()
+        store(entry)
+        return entry[0]
+    finally:
+        cache.delete(lock)
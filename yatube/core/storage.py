@@ -0,0 +1,123 @@
+"""Хранилище файлов с адресацией по содержимому.
+
+Файл сохраняется под именем ``<каталог>/<sha256><расширение>``:
+одинаковые загрузки попадают в один файл, а значит и в один набор
+миниатюр. Ссылки на файл из полей моделей считаются в ``Blob``
+(сигналами и явными вызовами ``change_references``); файлы без ссылок
+удаляет ``manage.py collect_media``.
+"""
+import hashlib
+import posixpath
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Count, F, FileField
+from django.utils import timezone
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from .models import Blob
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), digest.hexdigest() + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+def change_references(name, delta):
+    """Меняет число ссылок на файл; ``name`` может быть пустым."""
+    if not name:
+        return
+    blobs = Blob.objects.filter(name=name)
+    if delta > 0:
+        if not blobs.update(references=F('references') + delta,
+                            released=None):
+            Blob.objects.get_or_create(name=name)
+            blobs.update(references=F('references') + delta, released=None)
+        return
+    blobs.update(references=F('references') + delta)
+    blobs.filter(references__lte=0, released__isnull=True).update(
+        released=timezone.now())
+
+
+def referencing_fields():
+    """Поля моделей, которые хранят файлы в ``ContentAddressedStorage``."""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if (isinstance(field, FileField)
+                    and isinstance(field.storage, ContentAddressedStorage)):
+                yield model, field
+
+
+def recount_references():
+    """Пересчитывает ссылки по данным моделей, например после
+    ``bulk_create`` или ``update`` в обход ``change_references``."""
+    counts = Counter()
+    for model, field in referencing_fields():
+        rows = (model._default_manager.exclude(**{field.name: ''})
+                .order_by().values(field.name).annotate(total=Count('pk')))
+        for row in rows:
+            counts[row[field.name]] += row['total']
+    Blob.objects.exclude(name__in=counts).filter(references__gt=0).update(
+        references=0, released=timezone.now())
+    for name, total in counts.items():
+        Blob.objects.update_or_create(
+            name=name, defaults={'references': total, 'released': None})
+
+
+def locations():
+    """Пары (хранилище, каталог) из ``upload_to`` полей с файлами."""
+    return {(field.storage, field.upload_to)
+            for _, field in referencing_fields()
+            if isinstance(field.upload_to, str)}
+
+
+def unreferenced(grace):
+    """Файлы без ссылок старше ``grace`` секунд: учтённые в ``Blob``
+    и брошенные загрузки, до ``Blob`` не дошедшие."""
+    deadline = timezone.now() - timedelta(seconds=grace)
+    found = []
+    for storage, directory in locations():
+        blobs = Blob.objects.filter(name__startswith=directory)
+        found.extend((storage, name) for name in blobs.filter(
+            references__lte=0, released__lt=deadline,
+        ).values_list('name', flat=True))
+        if not storage.exists(directory):
+            continue
+        known = set(blobs.values_list('name', flat=True))
+        for filename in storage.listdir(directory)[1]:
+            name = posixpath.join(directory, filename)
+            if (name not in known
+                    and storage.get_modified_time(name) < deadline):
+                found.append((storage, name))
+    return found
+
+
+def collect_garbage(grace, dry_run=False):
+    """Удаляет файлы без ссылок вместе с миниатюрами sorl
+    и возвращает их имена."""
+    removed = []
+    for storage, name in unreferenced(grace):
+        if dry_run:
+            removed.append(name)
+            continue
+        # Ссылка могла появиться после выборки: такой файл не трогаем.
+        Blob.objects.filter(name=name, references__lte=0).delete()
+        if not Blob.objects.filter(name=name).exists():
+            delete(ImageFile(name, storage))
+            removed.append(name)
+    return removed
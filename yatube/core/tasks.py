@@ -0,0 +1,106 @@
+"""Простая очередь задач в базе данных.
+
+Функция, помеченная ``@task``, получает метод ``delay(**kwargs)``,
+который ставит вызов в очередь. Очередь разбирает команда
+``manage.py run_tasks``; при ``TASKS_EAGER = True`` задача
+выполняется сразу (удобно в тестах и при разработке).
+Модули ``tasks.py`` приложений импортируются при старте.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(func):
+    name = f'{func.__module__}.{func.__name__}'
+    registry[name] = func
+
+    def delay(**kwargs):
+        if settings.TASKS_EAGER:
+            return func(**kwargs)
+        # Задача фиксируется в той же транзакции, что и данные для неё.
+        Task.objects.create(name=name, payload=json.dumps(kwargs))
+
+    def delay_many(calls):
+        """Ставит в очередь сразу много вызовов одним INSERT."""
+        if settings.TASKS_EAGER:
+            for kwargs in calls:
+                func(**kwargs)
+            return
+        Task.objects.bulk_create(
+            [Task(name=name, payload=json.dumps(kwargs)) for kwargs in calls],
+            batch_size=500,
+        )
+
+    func.delay = delay
+    func.delay_many = delay_many
+    return func
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, которые выполняются дольше
+    ``TASKS_LEASE_TIMEOUT`` секунд: воркер, взявший их, скорее всего
+    упал. Задачи без оставшихся попыток помечаются ошибкой."""
+    deadline = timezone.now() - timedelta(
+        seconds=settings.TASKS_LEASE_TIMEOUT)
+    # Задачи, взятые до появления claimed_at, тоже считаются брошенными.
+    stale = Task.objects.filter(
+        Q(claimed_at__lt=deadline) | Q(claimed_at__isnull=True),
+        status=Task.RUNNING,
+    )
+    failed = stale.filter(
+        attempts__gte=settings.TASKS_MAX_ATTEMPTS).update(
+        status=Task.FAILED, error='Истёк срок выполнения')
+    return stale.update(status=Task.PENDING) + failed
+
+
+def claim(limit):
+    """Забирает до ``limit`` задач; чужие уже взятые пропускаются."""
+    requeue_stale()
+    ids = list(Task.objects.filter(status=Task.PENDING).order_by(
+        'id').values_list('id', flat=True)[:limit])
+    claimed = []
+    for task_id in ids:
+        taken = Task.objects.filter(id=task_id, status=Task.PENDING).update(
+            status=Task.RUNNING, attempts=F('attempts') + 1,
+            claimed_at=timezone.now())
+        if taken:
+            claimed.append(task_id)
+    return Task.objects.filter(id__in=claimed).order_by('id')
+
+
+def run(job):
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        func(**json.loads(job.payload))
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', job.name)
+        retry = job.attempts < settings.TASKS_MAX_ATTEMPTS
+        job.status = Task.PENDING if retry else Task.FAILED
+        job.error = traceback.format_exc()
+        job.save(update_fields=('status', 'error'))
+        return False
+    job.status = Task.DONE
+    job.save(update_fields=('status',))
+    return True
+
+
+def run_pending(limit=100):
+    """Выполняет задачи из очереди, возвращает число обработанных."""
+    jobs = list(claim(limit))
+    for job in jobs:
+        run(job)
+    return len(jobs)
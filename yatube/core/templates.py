@@ -0,0 +1,37 @@
+"""Прогрев кэша шаблонов.
+
+С кэширующим загрузчиком шаблон разбирается при первом обращении,
+и первые запросы каждого процесса платят за чтение и разбор всех
+своих шаблонов и include. ``warm_templates`` компилирует шаблоны
+заранее: ``wsgi.py`` вызывает её при старте процесса, команда
+``warm_templates`` — чтобы проверить, что все шаблоны собираются.
+"""
+import os
+
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.utils import get_app_template_dirs
+
+
+def template_names(directories):
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                yield os.path.relpath(
+                    os.path.join(root, name), directory).replace(os.sep, '/')
+
+
+def warm_templates(app_dirs=False):
+    """Компилирует шаблоны из ``DIRS`` (и папок приложений, если
+    ``app_dirs``) и возвращает их имена."""
+    warmed = []
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        directories = list(backend.engine.dirs)
+        if app_dirs:
+            directories += get_app_template_dirs('templates')
+        for name in sorted(set(template_names(directories))):
+            backend.get_template(name)
+            warmed.append(name)
+    return warmed
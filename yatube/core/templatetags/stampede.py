@@ -0,0 +1,39 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.stampede import get_or_compute
+
+register = template.Library()
+
+
+class SoftCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        key = make_template_fragment_key(
+            self.name, [var.resolve(context) for var in self.vary_on])
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context),
+            None if timeout is None else int(timeout))
+
+
+@register.tag
+def soft_cache(parser, token):
+    """Как ``{% cache %}``, но с защитой от одновременного пересчёта::
+
+        {% soft_cache timeout name var1 var2 %}...{% endsoft_cache %}
+    """
+    nodelist = parser.parse(('endsoft_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]} требует срок и имя фрагмента')
+    return SoftCacheNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]])
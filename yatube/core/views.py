@@ -1,4 +1,11 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+from .db import check_connection
 
 
 def page_not_found(request, exception):
@@ -15,3 +22,22 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def serve_media(request, path):
+    """Медиафайлы для DEBUG: имена неизменяемые, кэшируем надолго."""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if response.status_code == 200:
+        patch_cache_control(
+            response, public=True, immutable=True,
+            max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def health(request):
+    """Состояние баз; 503, если не отвечает основная."""
+    databases = {alias: check_connection(alias)
+                 for alias in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS)}
+    return JsonResponse(
+        {'databases': databases},
+        status=200 if databases[DEFAULT_DB_ALIAS] else 503)
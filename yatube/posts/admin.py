@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from . import search
+from .models import Comment, Follow, Group, Post, PostTrend, Tag
 
 
 @admin.register(Post)
@@ -11,6 +12,24 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     list_editable = ('group',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE '%...%'.
+        if not search_term:
+            return queryset, False
+        return search.filter_posts(queryset, search_term), False
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'posts_count')
+    search_fields = ('name',)
+
+
+@admin.register(PostTrend)
+class PostTrendAdmin(admin.ModelAdmin):
+    list_display = ('post', 'score', 'scored_at')
+    raw_id_fields = ('post',)
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
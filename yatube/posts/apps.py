@@ -4,6 +4,9 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+
 
 class CommentsConfig(AppConfig):
     name = 'comments'
@@ -0,0 +1,50 @@
+"""Версии кэша ленты и страниц.
+
+Ключи фрагментов и страниц включают номера версий; при изменении
+постов или групп версия увеличивается, и старые записи просто
+перестают читаться.
+"""
+import time
+
+from django.core.cache import cache
+
+FEED_VERSION_KEY = 'posts:feed_version'
+
+
+def _initial_version():
+    # Начинаем с отметки времени, чтобы после вытеснения ключа
+    # не совпасть с версиями ещё живых записей.
+    return int(time.time() * 1000)
+
+
+def cache_versions(*keys):
+    """Текущие версии ключей одним обращением к кэшу."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_cache_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache_versions(key)
+
+
+def feed_version():
+    return cache_versions(FEED_VERSION_KEY)[0]
+
+
+def bump_feed_version():
+    bump_cache_version(FEED_VERSION_KEY)
+
+
+def post_version_key(post_id):
+    return f'posts:post_version:{post_id}'
+
+
+def profile_version_key(username):
+    return f'posts:profile_version:{username}'
@@ -0,0 +1,34 @@
+"""Кэш отрисованных карточек постов.
+
+Ключ карточки — id поста и его ``version``, которую увеличивают правка
+поста, смена группы, готовность миниатюр и смена имени автора. Поэтому
+карточку не нужно удалять из кэша: новая версия просто читается
+по новому ключу. Карточки страницы достаются одним ``get_many``,
+отрисовываются только промахи.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'posts/includes/post.html'
+
+
+def card_key(post):
+    return f'posts:card:{post.pk}:{post.version}'
+
+
+def render_card(post):
+    return render_to_string(CARD_TEMPLATE, {'post': post})
+
+
+def prefetch_cards(posts):
+    """Кладёт в ``post.card`` готовую разметку карточки каждого поста."""
+    posts = {card_key(post): post for post in posts}
+    cached = cache.get_many(posts)
+    missed = {key: render_card(post) for key, post in posts.items()
+              if key not in cached}
+    if missed:
+        cache.set_many(missed, settings.POST_CARD_CACHE_TIMEOUT)
+    for key, post in posts.items():
+        post.card = mark_safe(cached.get(key) or missed[key])
@@ -0,0 +1,63 @@
+"""Валидаторы условных ответов для ``core.http.conditional``.
+
+Каждая функция одним запросом достаёт время последнего изменения
+постов страницы и счётчики, которые меняются при добавлении
+и удалении постов, комментариев и подписок. Для групп и авторов
+время хранится в ``posts_updated`` рядом со счётчиками, поэтому
+запрос не перебирает их посты.
+"""
+from django.db.models import Max
+from django.db.models.functions import Coalesce, Greatest
+
+from .cache import feed_version
+from .models import Group, Post, Tag, User
+from .tags import normalize
+
+
+def index_state(request):
+    # Удаление поста не меняет время последнего изменения, но меняет
+    # версию кэша ленты; свежий пост находится по индексу.
+    last = Post.objects.order_by('-updated').values_list(
+        'updated', flat=True).first()
+    return (feed_version(),), last
+
+
+def group_state(request, slug):
+    state = Group.objects.filter(slug=slug).values_list(
+        'title', 'description', 'posts_count', 'posts_updated').first()
+    if state is None:
+        return None
+    return state, state[-1]
+
+
+def profile_state(request, username):
+    state = User.objects.filter(username=username).values_list(
+        'first_name', 'last_name', 'stats__posts_count',
+        'stats__followers_count', 'stats__following_count',
+        'stats__posts_updated').first()
+    if state is None:
+        return None
+    return state, state[-1]
+
+
+def post_state(request, post_id):
+    state = Post.objects.filter(pk=post_id).order_by().values(
+        'version', 'comments_count', 'author__stats__posts_count',
+    ).annotate(
+        last=Greatest(
+            'updated', Coalesce(Max('comments__created'), 'updated')),
+    ).first()
+    if state is None:
+        return None
+    return tuple(state.values()), state['last']
+
+
+def tag_state(request, tag):
+    # На странице тега есть и список популярных тегов, поэтому она
+    # зависит от всех постов, как главная.
+    count = Tag.objects.filter(name=normalize(tag)).values_list(
+        'posts_count', flat=True).first()
+    if count is None:
+        return None
+    state, last = index_state(request)
+    return (*state, count), last
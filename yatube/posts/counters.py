@@ -0,0 +1,90 @@
+"""Атомарное обновление денормализованных счётчиков через ``F()``.
+
+Счётчики меняются сигналами при создании и удалении объектов;
+расхождения исправляет команда ``manage.py recount``.
+"""
+from django.db.models import (Count, F, IntegerField, Max, OuterRef,
+                              Subquery)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (AuthorStats, Comment, Follow, Group, Post, PostTag, Tag,
+                     User)
+
+
+def not_below_zero(queryset, field, delta):
+    """Уменьшение не уводит разошедшийся счётчик в минус (и не падает
+    на ограничении ``PositiveIntegerField``); его исправит ``recount``."""
+    if delta < 0:
+        return queryset.filter(**{f'{field}__gte': -delta})
+    return queryset
+
+
+def change_author_counter(user_id, field, delta):
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    updated = not_below_zero(stats, field, delta).update(
+        **{field: F(field) + delta})
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        stats.update(**{field: F(field) + delta})
+
+
+def change_counter(model, pk, field, delta):
+    if pk is not None:
+        not_below_zero(model.objects.filter(pk=pk), field, delta).update(
+            **{field: F(field) + delta})
+
+
+def touch_posts(author_ids, group_ids, when=None):
+    """Отмечает изменение постов на страницах авторов и групп: по этой
+    отметке страницы отдают ``Last-Modified`` без ``MAX`` по постам."""
+    when = when or timezone.now()
+    AuthorStats.objects.filter(user_id__in=author_ids).update(
+        posts_updated=when)
+    Group.objects.filter(pk__in=group_ids).update(posts_updated=when)
+
+
+def last_updated(field):
+    """Подзапрос ``MAX(updated)`` постов по ``field = OuterRef('pk')``."""
+    rows = (Post.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(last=Max('updated')).values('last'))
+    return Subquery(rows)
+
+
+def author_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def author_posts_count(user):
+    return author_stats(user).posts_count
+
+
+def count_of(queryset, field):
+    """Подзапрос ``COUNT(*)`` по ``field = OuterRef('pk')``."""
+    rows = (queryset.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recount():
+    """Пересчитывает все счётчики по данным таблиц."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True)
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk) for pk in missing.iterator()],
+        batch_size=500,
+    )
+    AuthorStats.objects.update(
+        posts_count=count_of(Post.objects.all(), 'author'),
+        followers_count=count_of(Follow.objects.all(), 'author'),
+        following_count=count_of(Follow.objects.all(), 'user'),
+        posts_updated=last_updated('author'),
+    )
+    Group.objects.update(posts_count=count_of(Post.objects.all(), 'group'),
+                         posts_updated=last_updated('group'))
+    Post.objects.update(
+        comments_count=count_of(Comment.objects.all(), 'post'))
+    Tag.objects.update(posts_count=count_of(PostTag.objects.all(), 'tag'))
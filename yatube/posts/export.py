@@ -0,0 +1,94 @@
+"""Потоковая выгрузка данных в JSONL.
+
+Посты идут от старых к новым пачками по ``(pub_date, id)``: память
+не растёт с размером таблицы, а курсор последней строки позволяет
+продолжить прерванную выгрузку. Записи постов совместимы
+с ``import_posts``.
+"""
+import json
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import Q
+
+from core.paginator import NEXT, decode_cursor, encode_cursor
+
+from .models import Comment, Follow, Post
+
+
+def decode_after(after):
+    """Позиция курсора ``after``; ``ValueError``, если курсор испорчен,
+    чтобы выгрузка не начиналась молча с начала."""
+    if not after:
+        return None
+    position = decode_cursor(after)
+    if position is None:
+        raise ValueError(f'Неверный курсор: {after}')
+    return position
+
+
+def post_batches(position=None, chunk_size=None):
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    posts = Post.objects.select_related('author', 'group').order_by(
+        'pub_date', 'pk')
+    while True:
+        batch = posts
+        if position:
+            _, pub_date, pk, _ = position
+            batch = batch.filter(Q(pub_date__gt=pub_date)
+                                 | Q(pub_date=pub_date, pk__gt=pk))
+        batch = list(batch[:chunk_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+        position = NEXT, last.pub_date, last.pk, 0
+
+
+def comments_for(posts):
+    comments = Comment.objects.filter(post__in=posts).select_related(
+        'author').order_by('post_id', 'created', 'pk')
+    return {post_id: list(items) for post_id, items in groupby(
+        comments, key=lambda comment: comment.post_id)}
+
+
+def post_record(post, comments):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'author': post.author.username,
+        'group': post.group.slug if post.group else None,
+        'pub_date': post.pub_date.isoformat(),
+        'image': post.image.name or None,
+        'comments': [{
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        } for comment in comments],
+        'cursor': encode_cursor(NEXT, post, 0),
+    }
+
+
+def export_posts(after=None, chunk_size=None):
+    """Строки JSONL с постами и их комментариями; после каждой строки
+    можно остановиться и продолжить с её ``cursor``. Курсор проверяется
+    сразу, до первой строки."""
+    return post_lines(decode_after(after), chunk_size)
+
+
+def post_lines(position, chunk_size):
+    for batch in post_batches(position, chunk_size):
+        comments = comments_for(batch)
+        for post in batch:
+            yield json.dumps(
+                post_record(post, comments.get(post.pk, ())),
+                ensure_ascii=False) + '\n'
+
+
+def export_follows(chunk_size=None):
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username')
+    for user, author in follows.iterator(
+            chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE):
+        yield json.dumps({'user': user, 'author': author},
+                         ensure_ascii=False) + '\n'
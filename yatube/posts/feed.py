@@ -0,0 +1,122 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Пост при публикации раскладывается в ``FeedItem`` всех подписчиков
+автора. Для авторов с числом подписчиков больше
+``settings.FEED_FANOUT_LIMIT`` раскладка не выполняется: их посты
+подмешиваются в ленту при чтении (гибридная схема pull). Когда автор
+переходит через лимит, ленты его подписчиков перестраивает задача
+``rebuild_author_feed``; до её окончания посты автора тоже читаются
+напрямую (``AuthorStats.pull_feed``).
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import AuthorStats, FeedItem, Follow, Post
+
+
+def is_pulled(author_id):
+    """Посты автора читаются напрямую, без раскладки по лентам."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).exists()
+
+
+def pulled_author_ids(user):
+    return list(Follow.objects.filter(
+        Q(author__stats__followers_count__gt=settings.FEED_FANOUT_LIMIT)
+        | Q(author__stats__pull_feed=True),
+        user=user,
+    ).values_list('author_id', flat=True))
+
+
+def fan_out(post):
+    if is_pulled(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    FeedItem.objects.bulk_create(
+        [FeedItem(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in follower_ids.iterator()],
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту свежие посты автора, на которого подписались."""
+    if is_pulled(follow.author_id):
+        return
+    posts = Post.objects.filter(author_id=follow.author_id).order_by(
+        '-pub_date', '-pk').values_list('pk', 'pub_date')
+    FeedItem.objects.bulk_create(
+        [FeedItem(user_id=follow.user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts[:settings.FEED_BACKFILL]],
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def crossed_limit(author_id, delta):
+    """Перешёл ли автор через ``FEED_FANOUT_LIMIT`` после изменения
+    числа подписчиков на ``delta``. Пока автор читался напрямую,
+    ``FeedItem`` для его постов и новых подписок не создавались; на пути
+    вниз его посты читаются напрямую и дальше, пока задача не разложит
+    их заново, иначе они пропали бы из лент."""
+    followers = AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    limit = settings.FEED_FANOUT_LIMIT
+    if delta < 0 and followers == limit:
+        AuthorStats.objects.filter(user_id=author_id).update(pull_feed=True)
+        return True
+    return delta > 0 and followers == limit + 1
+
+
+def rebuild_author(author_id):
+    """Раскладывает посты автора по лентам подписчиков или, если он
+    снова читается напрямую, удаляет ставшие ненужными строки."""
+    if is_pulled(author_id):
+        FeedItem.objects.filter(post__author_id=author_id).delete()
+    else:
+        # Новые посты и подписки уже раскладываются сигналами;
+        # совпадения с ними пропускает ignore_conflicts.
+        for follow in Follow.objects.filter(author_id=author_id).iterator():
+            backfill(follow)
+    AuthorStats.objects.filter(user_id=author_id).update(pull_feed=False)
+
+
+def retract(follow):
+    FeedItem.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id).delete()
+
+
+def to_posts(items):
+    return [item.post for item in items]
+
+
+def follow_feed(user):
+    """Возвращает выборку и параметры для ``CursorPaginator``."""
+    pulled = pulled_author_ids(user)
+    if not pulled:
+        items = FeedItem.objects.filter(user=user).select_related(
+            'post__author', 'post__group')
+        return items, {'tiebreak': 'post_id', 'transform': to_posts}
+    posts = Post.objects.filter(
+        Q(pk__in=FeedItem.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=pulled)
+    ).select_related('author', 'group')
+    return posts, {}
+
+
+def rebuild(user_ids=None):
+    """Перестраивает ленты заново, например после ``bulk_create``,
+    которое не вызывает сигналы."""
+    follows = Follow.objects.exclude(
+        author__stats__followers_count__gt=settings.FEED_FANOUT_LIMIT)
+    items = FeedItem.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    for follow in follows.iterator():
+        backfill(follow)
@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import Comment, Post
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
@@ -13,3 +13,10 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Найти', max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.all(), label='Группа', required=False)
+    author = forms.CharField(label='Автор', max_length=150, required=False)
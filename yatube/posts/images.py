@@ -0,0 +1,52 @@
+"""Обработка загруженных картинок постов.
+
+Картинка поворачивается по EXIF, уменьшается до
+``settings.POST_IMAGE_MAX_SIZE`` и перекодируется в
+``settings.POST_IMAGE_FORMAT``. Метаданные (EXIF, профили, комментарии)
+при этом не переносятся.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'WEBP': 'webp',
+}
+
+
+def flatten(image, mode):
+    """Приводит картинку к режиму, который умеет формат;
+    прозрачность JPEG заменяет белым фоном."""
+    if image.mode in ('RGB', mode):
+        return image
+    image = image.convert('RGBA')
+    if mode == 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def optimize(file):
+    """Возвращает байты перекодированной картинки и её расширение."""
+    image_format = settings.POST_IMAGE_FORMAT
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(settings.POST_IMAGE_MAX_SIZE, Image.LANCZOS)
+        output = BytesIO()
+        if image_format == 'WEBP':
+            flatten(image, 'RGBA').save(
+                output, 'WEBP', quality=settings.POST_IMAGE_QUALITY,
+                method=6)
+        else:
+            flatten(image, 'L').save(
+                output, 'JPEG', quality=settings.POST_IMAGE_QUALITY,
+                optimize=True, progressive=True)
+    return output.getvalue(), EXTENSIONS[image_format]
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import export_follows, export_posts
+
+
+class Command(BaseCommand):
+    help = ('Потоковая выгрузка постов с комментариями или подписок '
+            'в JSONL. Прерванную выгрузку постов можно продолжить '
+            'с курсора последней строки: --after <cursor>.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kind', nargs='?', choices=('posts', 'follows'), default='posts')
+        parser.add_argument('--after', help='Курсор последней строки')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--output', help='Файл; по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        if options['kind'] == 'follows':
+            lines = export_follows(options['chunk_size'])
+        else:
+            try:
+                lines = export_posts(options['after'],
+                                     options['chunk_size'])
+            except ValueError as error:
+                raise CommandError(error)
+        if options['output']:
+            # Дописываем: продолжение выгрузки ложится в тот же файл.
+            with open(options['output'], 'a', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            self.stdout.writelines(lines)
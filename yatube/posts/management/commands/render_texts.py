@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from posts.cache import bump_feed_version
+from posts.counters import touch_posts
+from posts.markup import existing_usernames, render_text
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = ('Заполняет text_html постов и комментариев. По умолчанию '
+            'только пустые; --all пересобирает всё, например после '
+            'изменения правил разметки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = self.render(Post, options)
+        comments = self.render(Comment, options)
+        if posts or comments:
+            bump_feed_version()
+        self.stdout.write(f'Постов: {posts}, комментариев: {comments}')
+
+    def render(self, model, options):
+        post_field = 'post_id' if model is Comment else 'pk'
+        queryset = model.objects.order_by('pk').only('text', post_field)
+        if not options['all']:
+            queryset = queryset.filter(text_html='')
+        total = 0
+        last = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last)[:options['batch_size']])
+            if not batch:
+                return total
+            usernames = existing_usernames(obj.text for obj in batch)
+            for obj in batch:
+                obj.text_html = render_text(obj.text, usernames)
+            post_ids = {getattr(obj, post_field) for obj in batch}
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ['text_html'])
+                # Новая версия поста — новые карточка и ETag страницы.
+                now = timezone.now()
+                posts = Post.objects.filter(pk__in=post_ids)
+                posts.update(version=F('version') + 1, updated=now)
+                touch_posts(posts.values('author_id'),
+                            posts.values('group_id'), now)
+            total += len(batch)
+            last = batch[-1].pk
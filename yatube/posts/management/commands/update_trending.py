@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import prune, refresh
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает ленту «В тренде» и удаляет активность '
+            'старше окна тренда')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять каждые N секунд; по умолчанию один раз')
+
+    def handle(self, *args, **options):
+        while True:
+            pruned = prune()
+            ranking = refresh()
+            self.stdout.write(
+                f'В тренде постов: {len(ranking["posts"])}, '
+                f'групп: {len(ranking["groups"])}; '
+                f'удалено устаревших: {pruned}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
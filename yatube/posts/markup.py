@@ -0,0 +1,74 @@
+"""Разметка текста постов и комментариев.
+
+Ссылки, хэштеги, упоминания ``@username`` и переносы строк
+превращаются в HTML один раз — при сохранении поста или комментария
+с новым текстом или командой ``render_texts``. Шаблоны выводят готовую строку
+``text_html``. Всё, кроме созданных здесь тегов, экранируется.
+"""
+import re
+
+from django.urls import reverse
+from django.utils.html import escape, linebreaks
+
+from .models import User
+
+URL_RE = r'(?P<url>(?:https?://|www\.)[^\s<>"]+)'
+HASHTAG_RE = re.compile(r'(?<![\w&])#(?P<tag>\w{1,50})')
+MENTION_RE = re.compile(r'(?<![\w@])@(?P<user>\w[\w.+-]{0,149})')
+TOKEN_RE = re.compile('|'.join(
+    (URL_RE, HASHTAG_RE.pattern, MENTION_RE.pattern)))
+TRAILING_PUNCTUATION = '.,:;!?)'
+
+
+def mentions(text):
+    return {match.group('user').rstrip(TRAILING_PUNCTUATION)
+            for match in MENTION_RE.finditer(text)}
+
+
+def existing_usernames(texts):
+    """Имена упомянутых в ``texts`` пользователей, которые есть
+    в базе, — одним запросом на всю пачку."""
+    names = set().union(*(mentions(text) for text in texts))
+    if not names:
+        return set()
+    return set(User.objects.filter(username__in=names).values_list(
+        'username', flat=True))
+
+
+def link(href, text, external=False):
+    rel = ' rel="nofollow noopener"' if external else ''
+    return f'<a href="{escape(href)}"{rel}>{escape(text)}</a>'
+
+
+def hashtag_url(tag):
+    return reverse('posts:tag_posts', args=(tag.lower(),))
+
+
+def render_token(match, usernames):
+    token = match.group(0)
+    stripped = token.rstrip(TRAILING_PUNCTUATION)
+    tail = escape(token[len(stripped):])
+    if match.group('url'):
+        href = stripped if '://' in stripped else f'http://{stripped}'
+        return link(href, stripped, external=True) + tail
+    if match.group('tag'):
+        return link(hashtag_url(match.group('tag')), token)
+    if stripped[1:] in usernames:
+        return link(reverse('posts:profile', args=(stripped[1:],)),
+                    stripped) + tail
+    return escape(token)
+
+
+def render_text(text, usernames=None):
+    """HTML для ``text``; ``usernames`` — известные имена для
+    упоминаний, если их уже достали для всей пачки."""
+    if usernames is None:
+        usernames = existing_usernames([text])
+    parts = []
+    position = 0
+    for match in TOKEN_RE.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(render_token(match, usernames))
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return linebreaks(''.join(parts), autoescape=False)
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:27
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_references(apps, schema_editor):
+    Blob = apps.get_model('core', 'Blob')
+    Post = apps.get_model('posts', 'Post')
+    images = (Post.objects.exclude(image='').order_by().values('image')
+              .annotate(total=Count('pk')))
+    Blob.objects.bulk_create(
+        [Blob(name=row['image'], references=row['total'], released=None)
+         for row in images],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_blob'),
+        ('posts', '0016_post_image_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:42
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+HASHTAG_RE = re.compile(r'(?<![\w&])#(\w{1,50})')
+
+
+def tag_existing_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    PostTag = apps.get_model('posts', 'PostTag')
+    tagged = [
+        (pk, pub_date, {tag.lower() for tag in HASHTAG_RE.findall(text)})
+        for pk, pub_date, text in Post.objects.filter(
+            text__contains='#').values_list('pk', 'pub_date', 'text')
+        .iterator()
+    ]
+    names = set().union(*(names for _, _, names in tagged))
+    Tag.objects.bulk_create([Tag(name=name) for name in names])
+    ids = dict(Tag.objects.values_list('name', 'pk'))
+    rows = [PostTag(tag_id=ids[name], post_id=pk, pub_date=pub_date)
+            for pk, pub_date, names in tagged for name in names]
+    PostTag.objects.bulk_create(rows, batch_size=500)
+    for tag_id, total in Counter(row.tag_id for row in rows).items():
+        Tag.objects.filter(pk=tag_id).update(posts_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_text_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Тег поста',
+                'verbose_name_plural': 'Теги постов',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Тег')),
+                ('posts_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Постов')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-posts_count'], name='tag_posts_count_idx'),
+        ),
+        migrations.AddField(
+            model_name='posttag',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Post'),
+        ),
+        migrations.AddField(
+            model_name='posttag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Tag'),
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-pub_date', '-post'], name='post_tag_pub_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='posttag',
+            unique_together={('tag', 'post')},
+        ),
+        migrations.RunPython(tag_existing_posts, migrations.RunPython.noop),
+    ]
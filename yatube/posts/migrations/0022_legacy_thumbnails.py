@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:05
+
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def enqueue_thumbnails(apps, schema_editor):
+    # Миниатюры старых постов раньше строились прямо в запросе. Теперь
+    # их готовит воркер, а до тех пор шаблон показывает заглушку.
+    Post = apps.get_model('posts', 'Post')
+    Task = apps.get_model('core', 'Task')
+    ids = list(Post.objects.exclude(image='').filter(
+        thumbnails_ready=True).values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        Post.objects.filter(pk__in=batch).update(thumbnails_ready=False)
+        Task.objects.bulk_create([
+            Task(name='posts.tasks.generate_thumbnails',
+                 payload=json.dumps({'post_id': pk}))
+            for pk in batch
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_task_claimed_at'),
+        ('posts', '0021_post_trend'),
+    ]
+
+    operations = [
+        migrations.RunPython(enqueue_thumbnails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_legacy_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='pull_feed',
+            field=models.BooleanField(default=False, help_text='Пока воркер заново раскладывает посты подписчикам', verbose_name='Лента читает посты напрямую'),
+        ),
+    ]
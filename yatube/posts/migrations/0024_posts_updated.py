@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:13
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def last_updated(Post, field):
+    return Subquery(Post.objects.filter(**{field: OuterRef('pk')}).order_by()
+                    .values(field).annotate(last=Max('updated'))
+                    .values('last'))
+
+
+def fill_posts_updated(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    apps.get_model('posts', 'AuthorStats').objects.update(
+        posts_updated=last_updated(Post, 'author'))
+    apps.get_model('posts', 'Group').objects.update(
+        posts_updated=last_updated(Post, 'group'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_authorstats_pull_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='posts_updated',
+            field=models.DateTimeField(null=True, verbose_name='Последнее изменение постов'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_updated',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Последнее изменение постов'),
+        ),
+        migrations.RunPython(fill_posts_updated, migrations.RunPython.noop),
+    ]
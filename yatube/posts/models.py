@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -16,6 +18,14 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name="Описание",
         help_text="Введите описание группы")
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Постов")
+    posts_updated = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name="Последнее изменение постов")
 
     class Meta:
         verbose_name = 'Группа'
@@ -29,10 +39,18 @@ class Post(models.Model):
     text = models.TextField(
         verbose_name="Текст поста",
         help_text="Введите текст поста")
+    text_html = models.TextField(
+        verbose_name="Текст поста в HTML",
+        blank=True,
+        editable=False)
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Дата публикации",
         help_text="Дата публикации")
+    updated = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения")
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -50,13 +68,40 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_hash = models.CharField(
+        verbose_name='Хэш картинки',
+        max_length=64,
+        blank=True,
+        editable=False,
+        db_index=True)
+    thumbnails_ready = models.BooleanField(
+        verbose_name='Миниатюры готовы',
+        default=False,
+        editable=False)
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Комментариев")
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Версия карточки")
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -78,6 +123,10 @@ class Comment(models.Model):
     text = models.TextField(
         verbose_name="Текст комментария",
         help_text="Введите текст комментария")
+    text_html = models.TextField(
+        verbose_name="Текст комментария в HTML",
+        blank=True,
+        editable=False)
     created = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Дата публикации",
@@ -86,6 +135,10 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -100,3 +153,124 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписки'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
+
+class FeedItem(models.Model):
+    """Пост в материализованной ленте подписок пользователя.
+
+    Заполняется при публикации поста и при подписке, поэтому лента
+    ``follow_index`` читается одним диапазоном по индексу
+    ``(user, pub_date)`` без соединения с ``Follow``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="feed_items")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="feed_items")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Элемент ленты'
+        verbose_name_plural = 'Лента подписок'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='feed_user_pub_date_idx'),
+        ]
+
+
+class Tag(models.Model):
+    """Хэштег в нормализованном виде (в нижнем регистре).
+
+    ``posts_count`` меняется сигналами, поэтому популярные теги
+    читаются по индексу без подсчёта постов.
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name="Тег")
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Постов")
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+        indexes = [
+            models.Index(fields=['-posts_count'],
+                         name='tag_posts_count_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    """Пост с тегом. Дата публикации скопирована из поста, чтобы
+    лента тега читалась диапазоном по индексу ``(tag, pub_date)``."""
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE,
+                            related_name="post_tags")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="post_tags")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+        unique_together = ('tag', 'post')
+        indexes = [
+            models.Index(fields=['tag', '-pub_date', '-post'],
+                         name='post_tag_pub_date_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора.
+
+    Обновляются сигналами, чтобы страницы не выполняли ``COUNT(*)``
+    по постам автора при каждом запросе.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name="stats")
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Постов")
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Подписчиков")
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Подписок")
+    pull_feed = models.BooleanField(
+        default=False,
+        verbose_name="Лента читает посты напрямую",
+        help_text="Пока воркер заново раскладывает посты подписчикам")
+    posts_updated = models.DateTimeField(
+        null=True,
+        verbose_name="Последнее изменение постов")
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class PostTrend(models.Model):
+    """Активность поста для ленты «В тренде».
+
+    ``score`` — сумма весов публикации и комментариев, затухающая
+    с периодом полураспада ``TRENDING_HALF_LIFE`` и приведённая
+    к моменту ``scored_at``. Строки старше окна тренда удаляются,
+    поэтому таблица остаётся небольшой.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True, related_name="trend")
+    score = models.FloatField(default=0)
+    scored_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Активность поста'
+        verbose_name_plural = 'Активность постов'
@@ -0,0 +1,20 @@
+"""Версии закэшированных страниц для анонимных посетителей.
+
+Все страницы ленты зависят от версии ленты: её увеличивает любое
+изменение постов и групп. Страница поста дополнительно зависит
+от своих комментариев, профиль — от подписок на автора.
+"""
+from .cache import (FEED_VERSION_KEY, cache_versions, post_version_key,
+                    profile_version_key)
+
+
+def feed_page(request, **kwargs):
+    return cache_versions(FEED_VERSION_KEY)
+
+
+def profile_page(request, username):
+    return cache_versions(FEED_VERSION_KEY, profile_version_key(username))
+
+
+def post_page(request, post_id):
+    return cache_versions(FEED_VERSION_KEY, post_version_key(post_id))
@@ -0,0 +1,97 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite текст постов дублируется в виртуальную таблицу FTS5
+(``rowid`` равен id поста), которую синхронизируют сигналы.
+Результаты ранжируются по ``bm25`` и листаются ``CursorPaginator``
+по паре (ранг, id). На других СУБД поиск откатывается к ``icontains``.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def terms(text):
+    return re.findall(r'\w+', text)[:16]
+
+
+def match_expression(text):
+    """Слова запроса в кавычках, чтобы синтаксис FTS5 не мешал поиску;
+    каждое ищется как префикс, все вместе — через AND."""
+    return ' '.join(f'"{term}"*' for term in terms(text))
+
+
+def index_post(post):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, text) '
+            f'VALUES (%s, %s)', [post.pk, post.text])
+
+
+def unindex_post(post_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def index_missing():
+    """Добавляет в индекс посты, созданные в обход сигналов
+    (``bulk_create``)."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            f'SELECT id, text FROM posts_post WHERE id NOT IN '
+            f'(SELECT rowid FROM {FTS_TABLE})')
+
+
+def filter_posts(queryset, text):
+    """Оставляет в выборке найденные посты, без ранжирования."""
+    if not terms(text):
+        return queryset.none()
+    if not is_supported():
+        condition = Q()
+        for term in terms(text):
+            condition &= Q(text__icontains=term)
+        return queryset.filter(condition)
+    # Не RawSQL: Django взял бы подзапрос во вторые скобки,
+    # и SQLite счёл бы его скалярным.
+    return queryset.extra(
+        where=[f'posts_post.id IN (SELECT rowid FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s)'],
+        params=[match_expression(text)],
+    )
+
+
+def search_posts(text, group=None, author=None):
+    """Возвращает выборку и параметры для ``CursorPaginator``:
+    на SQLite — по рангу, иначе — от новых к старым."""
+    posts = Post.objects.select_related('author', 'group')
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author:
+        posts = posts.filter(author__username=author)
+    if not terms(text) or not is_supported():
+        return filter_posts(posts, text), {}
+    posts = posts.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = posts_post.id',
+               f'{FTS_TABLE} MATCH %s'],
+        params=[match_expression(text)],
+    ).annotate(rank=RawSQL(f'{FTS_TABLE}.rank', ()))
+    # Чем меньше bm25, тем выше пост в выдаче.
+    return posts, {'field': 'rank', 'descending': False, 'numeric': True}
@@ -0,0 +1,222 @@
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.storage import change_references
+
+from . import feed, search, tags, trending
+from .cache import (bump_cache_version, bump_feed_version, post_version_key,
+                    profile_version_key)
+from .counters import change_author_counter, change_counter, touch_posts
+from .markup import render_text
+from .models import Comment, Follow, Group, Post, PostTag, Tag, User
+from .tasks import rebuild_author_feed
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Через __dict__, чтобы не загружать отложенное поле.
+    instance._saved_group_id = instance.__dict__.get('group_id')
+    instance._saved_text = instance.__dict__.get('text')
+    image = instance.__dict__.get('image')
+    instance._saved_image = getattr(image, 'name', image)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        change_author_counter(instance.author_id, 'posts_count', 1)
+        change_counter(Group, instance.group_id, 'posts_count', 1)
+    elif instance.group_id != instance._saved_group_id:
+        change_counter(Group, instance._saved_group_id, 'posts_count', -1)
+        change_counter(Group, instance.group_id, 'posts_count', 1)
+    touch_posts([instance.author_id],
+                [instance.group_id, instance._saved_group_id],
+                instance.updated)
+    instance._saved_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_author_counter(instance.author_id, 'posts_count', -1)
+    change_counter(Group, instance.group_id, 'posts_count', -1)
+    touch_posts([instance.author_id], [instance.group_id])
+
+
+@receiver(post_save, sender=Post)
+def reference_image(sender, instance, created, **kwargs):
+    # Отложенное поле картинки при сохранении не меняется.
+    if 'image' not in instance.__dict__:
+        return
+    if created:
+        change_references(instance.image.name, 1)
+    elif instance.image.name != instance._saved_image:
+        change_references(instance._saved_image, -1)
+        change_references(instance.image.name, 1)
+    instance._saved_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    change_references(instance.image.name, -1)
+
+
+@receiver(post_init, sender=Comment)
+def remember_comment_text(sender, instance, **kwargs):
+    instance._saved_text = instance.__dict__.get('text')
+
+
+@receiver(post_save, sender=Comment)
+def forget_comment_text(sender, instance, **kwargs):
+    instance._saved_text = instance.__dict__.get('text')
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def render_text_html(sender, instance, update_fields=None, **kwargs):
+    # HTML пересобирается при любом сохранении нового текста, а не
+    # только из форм: шаблоны выводят text_html, если он не пуст.
+    if 'text' not in instance.__dict__:
+        return
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    if (instance._state.adding or not instance.text_html
+            or instance.text != instance._saved_text):
+        instance.text_html = render_text(instance.text)
+
+
+@receiver(pre_save, sender=Post)
+def bump_post_version(sender, instance, **kwargs):
+    # Новая версия — новый ключ кэшированной карточки поста.
+    if not instance._state.adding:
+        instance.version += 1
+
+
+@receiver(post_init, sender=User)
+def remember_full_name(sender, instance, **kwargs):
+    instance._saved_full_name = (
+        instance.__dict__.get('first_name'),
+        instance.__dict__.get('last_name'),
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_author_posts_version(sender, instance, created, **kwargs):
+    full_name = instance.first_name, instance.last_name
+    if not created and full_name != instance._saved_full_name:
+        now = timezone.now()
+        posts = Post.objects.filter(author=instance)
+        posts.update(version=F('version') + 1, updated=now)
+        touch_posts([instance.pk], posts.values('group_id'), now)
+        bump_feed_version()
+    instance._saved_full_name = full_name
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Post, instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_counter(Post, instance.post_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created:
+        change_author_counter(instance.author_id, 'followers_count', 1)
+        change_author_counter(instance.user_id, 'following_count', 1)
+        if feed.crossed_limit(instance.author_id, 1):
+            rebuild_author_feed.delay(author_id=instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_author_counter(instance.author_id, 'followers_count', -1)
+    change_author_counter(instance.user_id, 'following_count', -1)
+    if feed.crossed_limit(instance.author_id, -1):
+        rebuild_author_feed.delay(author_id=instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def retract_feed(sender, instance, **kwargs):
+    feed.retract(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feed_cache(sender, **kwargs):
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_page(sender, instance, **kwargs):
+    bump_cache_version(post_version_key(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profile_pages(sender, instance, **kwargs):
+    # Счётчики подписок меняются у обоих профилей.
+    usernames = User.objects.filter(
+        pk__in=(instance.user_id, instance.author_id)).values_list(
+        'username', flat=True)
+    for username in usernames:
+        bump_cache_version(profile_version_key(username))
+
+
+@receiver(post_save, sender=Post)
+def tag_post(sender, instance, created, **kwargs):
+    if 'text' not in instance.__dict__:
+        return
+    if created:
+        tags.tag_posts([instance])
+    elif instance.text != instance._saved_text:
+        tags.sync_post(instance)
+    instance._saved_text = instance.text
+
+
+@receiver(post_delete, sender=PostTag)
+def count_deleted_post_tag(sender, instance, **kwargs):
+    change_counter(Tag, instance.tag_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def record_post_trend(sender, instance, created, **kwargs):
+    if created:
+        trending.record_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_trend(sender, instance, created, **kwargs):
+    if created:
+        trending.record_comment(instance)
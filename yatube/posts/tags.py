@@ -0,0 +1,66 @@
+"""Хэштеги постов.
+
+Теги разбираются из текста при сохранении поста и раскладываются
+в ``PostTag``, как посты в ленты подписок, поэтому лента тега
+листается курсором по индексу ``(tag, pub_date)``. Счётчик
+``Tag.posts_count`` растёт здесь, а уменьшается сигналом удаления
+``PostTag`` — в том числе каскадного вместе с постом.
+"""
+from collections import Counter
+
+from django.conf import settings
+
+from .counters import change_counter
+from .markup import TOKEN_RE
+from .models import PostTag, Tag
+
+
+def normalize(tag):
+    return tag.lower()
+
+
+def extract(text):
+    # Разбор тот же, что у разметки: ``#`` внутри ссылки не тег.
+    return {normalize(match.group('tag'))
+            for match in TOKEN_RE.finditer(text) if match.group('tag')}
+
+
+def tag_ids(names):
+    Tag.objects.bulk_create([Tag(name=name) for name in names],
+                            ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+
+
+def add_tags(tagged):
+    """``tagged`` — пары (пост, имена тегов) для добавления."""
+    tagged = [(post, names) for post, names in tagged if names]
+    if not tagged:
+        return
+    ids = tag_ids(set().union(*(names for _, names in tagged)))
+    rows = [PostTag(tag_id=ids[name], post_id=post.pk,
+                    pub_date=post.pub_date)
+            for post, names in tagged for name in names]
+    PostTag.objects.bulk_create(rows, batch_size=500)
+    for tag_id, total in Counter(row.tag_id for row in rows).items():
+        change_counter(Tag, tag_id, 'posts_count', total)
+
+
+def tag_posts(posts):
+    """Раскладывает по тегам новые посты, например после
+    ``bulk_create``, которое не вызывает сигналы."""
+    add_tags((post, extract(post.text)) for post in posts)
+
+
+def sync_post(post):
+    names = extract(post.text)
+    current = dict(PostTag.objects.filter(post=post).values_list(
+        'tag__name', 'pk'))
+    removed = [pk for name, pk in current.items() if name not in names]
+    if removed:
+        PostTag.objects.filter(pk__in=removed).delete()
+    add_tags([(post, names - current.keys())])
+
+
+def popular_tags(limit=None):
+    return list(Tag.objects.filter(posts_count__gt=0).order_by(
+        '-posts_count', 'name')[:limit or settings.POPULAR_TAGS_LIMIT])
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from core.storage import change_references
+from core.tasks import task
+
+from . import feed, images
+from .cache import bump_feed_version
+from .counters import touch_posts
+from .models import Post
+
+
+def touch_post(post_id, now):
+    post = Post.objects.filter(pk=post_id)
+    touch_posts(post.values('author_id'), post.values('group_id'), now)
+
+
+@task
+def process_image(post_id):
+    """Ужимает загруженную картинку поста и готовит миниатюры."""
+    post = Post.objects.filter(pk=post_id).only('image', 'image_hash').first()
+    if post is None or not post.image:
+        return
+    original = post.image.name
+    if not (post.image_hash
+            and original.startswith(f'posts/{post.image_hash}.')):
+        with post.image.open('rb') as file:
+            content, extension = images.optimize(file)
+        # Хранилище само назовёт файл хэшем содержимого.
+        name = post.image.storage.save(
+            f'posts/image.{extension}', ContentFile(content))
+        # Картинку могли заменить, пока задача ждала в очереди.
+        now = timezone.now()
+        updated = Post.objects.filter(pk=post_id, image=original).update(
+            image=name, image_hash=images.content_hash(content),
+            version=F('version') + 1, updated=now)
+        if not updated:
+            return
+        touch_post(post_id, now)
+        # Оригинал без других ссылок удалит collect_media.
+        change_references(name, 1)
+        change_references(original, -1)
+    generate_thumbnails(post_id=post_id)
+
+
+@task
+def generate_thumbnails(post_id):
+    """Готовит все миниатюры картинки поста вне цикла запроса."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    for geometry, options in settings.POST_THUMBNAILS.items():
+        get_thumbnail(post.image, geometry, **options)
+    # Картинку могли заменить, пока задача ждала в очереди.
+    now = timezone.now()
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails_ready=True, version=F('version') + 1, updated=now)
+    if updated:
+        touch_post(post_id, now)
+        bump_feed_version()
+
+
+@task
+def rebuild_author_feed(author_id):
+    """Перестраивает ленты подписчиков автора после перехода через
+    ``FEED_FANOUT_LIMIT``."""
+    feed.rebuild_author(author_id)
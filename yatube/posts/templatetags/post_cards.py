@@ -0,0 +1,20 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_cards(posts):
+    cards.prefetch_cards(posts)
+    return ''
+
+
+@register.simple_tag
+def post_card(post):
+    card = getattr(post, 'card', None)
+    if card is None:
+        cards.prefetch_cards([post])
+        card = post.card
+    return card
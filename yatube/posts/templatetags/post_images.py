@@ -0,0 +1,46 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html
+from sorl.thumbnail.base import ThumbnailBackend
+
+register = template.Library()
+
+
+class ThumbnailMissing(Exception):
+    pass
+
+
+class PreparedThumbnails(ThumbnailBackend):
+    """Отдаёт только миниатюры, которые уже приготовил воркер
+    ``generate_thumbnails``; уменьшать картинку в запросе не даёт."""
+    def _create_thumbnail(self, *args, **kwargs):
+        raise ThumbnailMissing
+
+
+prepared = PreparedThumbnails()
+
+
+@register.simple_tag
+def responsive_image(image, css_class='card-img my-2', alt=''):
+    """``<img>`` со ``srcset`` из вариантов ``POST_THUMBNAILS``:
+    браузер сам выбирает ширину под экран и грузит её лениво.
+    Если миниатюр ещё нет, выводится оригинал."""
+    try:
+        variants = {
+            geometry: prepared.get_thumbnail(image, geometry, **options)
+            for geometry, options in settings.POST_THUMBNAILS.items()
+        }
+    except ThumbnailMissing:
+        return format_html(
+            '<img class="{}" src="{}" loading="lazy" decoding="async" '
+            'alt="{}">', css_class, image.url, alt)
+    default = variants[settings.POST_IMAGE_DEFAULT]
+    srcset = ', '.join(
+        f'{thumbnail.url} {thumbnail.width}w'
+        for thumbnail in sorted(variants.values(),
+                                key=lambda thumbnail: thumbnail.width))
+    return format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}" loading="lazy" decoding="async" alt="{}">',
+        css_class, default.url, srcset, settings.POST_IMAGE_SIZES,
+        default.width, default.height, alt)
@@ -0,0 +1,260 @@
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import SQLiteCache
+from core.stampede import get_or_compute, single_flight
+from posts import cards
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(
+            os.path.join(self.directory, 'cache.sqlite3'), {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertEqual(
+            self.cache.get_many(['key', 'missing']), {'key': {'value': 1}})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_value_is_missing(self):
+        self.cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_shared_between_instances(self):
+        other = SQLiteCache(self.cache.location, {})
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, FEED_CACHE_TIMEOUT=600)
+class FeedCacheInvalidationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_new_post_visible_immediately(self):
+        Post.objects.create(text='Первый пост', author=self.user)
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            'Первый пост')
+        Post.objects.create(text='Второй пост', author=self.user)
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            'Второй пост')
+
+    def test_fragment_cached_between_changes(self):
+        post = Post.objects.create(text='Текст поста', author=self.user)
+        self.client.get(reverse('posts:index'))
+        # Карточка кэшируется по версии поста, её меняем вместе с текстом.
+        Post.objects.filter(pk=post.pk).update(
+            text='Без сигнала', text_html='', version=F('version') + 1)
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            'Текст поста')
+        Group.objects.create(title='Группа', slug='slug', description='-')
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            'Без сигнала')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        for number in range(3):
+            Post.objects.create(text=f'Пост {number}', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def profile_page(self):
+        return self.client.get(reverse('posts:profile', args=('auth',)))
+
+    def test_cards_rendered_once(self):
+        with mock.patch('posts.cards.render_card',
+                        wraps=cards.render_card) as render:
+            self.assertContains(self.profile_page(), 'Пост 2')
+            self.assertEqual(render.call_count, 3)
+            self.assertContains(self.profile_page(), 'Лев Толстой')
+            self.assertEqual(render.call_count, 3)
+
+    def test_card_follows_post_version(self):
+        self.profile_page()
+        post = Post.objects.get(text='Пост 1')
+        post.text = 'Исправленный пост'
+        post.group = self.group
+        post.save()
+        self.assertContains(self.profile_page(), 'Исправленный пост')
+        Post.objects.filter(pk=post.pk).update(text='Без сигнала')
+        self.assertNotContains(self.profile_page(), 'Без сигнала')
+
+    def test_author_rename_bumps_version(self):
+        self.profile_page()
+        self.user.first_name = 'Алексей'
+        self.user.save()
+        response = self.profile_page()
+        self.assertNotContains(response, 'Лев Толстой')
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(
+            set(Post.objects.values_list('version', flat=True)), {2})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Текст поста', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_served_without_queries(self):
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=('auth',)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('about:author'),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                etag = Client().get(url).get('ETag')
+                with self.assertNumQueries(0):
+                    response = Client().get(url)
+                self.assertEqual(response.status_code, 200)
+                if etag:
+                    with self.assertNumQueries(0):
+                        response = Client().get(
+                            url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_pages(self):
+        index = reverse('posts:index')
+        detail = reverse('posts:post_detail', args=(self.post.pk,))
+        profile = reverse('posts:profile', args=('auth',))
+        for url in (index, detail, profile):
+            Client().get(url)
+        Post.objects.create(text='Новый пост', author=self.user)
+        self.assertContains(Client().get(index), 'Новый пост')
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        self.assertContains(Client().get(detail), 'Комментарий')
+        Client().get(profile)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(
+            Client().get(profile).context['stats'].followers_count, 1)
+
+    def test_authorized_users_bypass_cache(self):
+        url = reverse('posts:index')
+        Client().get(url)
+        client = Client()
+        client.force_login(self.reader)
+        self.assertContains(client.get(url), 'Пользователь: reader')
+        self.assertNotContains(Client().get(url), 'Пользователь:')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CACHE_LOCK_TIMEOUT=1,
+                   CACHE_POLL_INTERVAL=0.01)
+class StampedeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        def request():
+            results.append(single_flight(
+                'key', compute, lambda value: cache.set('key', value)))
+
+        results = []
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_waiter_computes_when_lock_released_empty(self):
+        cache.add('key:lock', 1)
+        threading.Timer(0.05, cache.delete, ('key:lock',)).start()
+        store = mock.Mock()
+        self.assertEqual(single_flight('key', lambda: 'own', store), 'own')
+        store.assert_not_called()
+
+    def test_fresh_value_not_recomputed(self):
+        compute = mock.Mock(return_value='value')
+        self.assertEqual(get_or_compute('key', compute, 60), 'value')
+        self.assertEqual(get_or_compute('key', compute, 60), 'value')
+        compute.assert_called_once()
+
+    def test_stale_value_served_while_refreshing(self):
+        cache.set('key', ('old', time.time() - 1, 0.1))
+        cache.add('key:lock', 1)
+        compute = mock.Mock(return_value='new')
+        self.assertEqual(get_or_compute('key', compute, 60), 'old')
+        compute.assert_not_called()
+        cache.delete('key:lock')
+        self.assertEqual(get_or_compute('key', compute, 60), 'new')
+        self.assertEqual(get_or_compute('key', compute, 60), 'new')
+        compute.assert_called_once()
+
+    def test_early_expiration(self):
+        # Считается 10 секунд, до срока 5: при random() = 1/e
+        # пересчёт начинается за 10 * beta секунд до срока.
+        cache.set('key', ('old', time.time() + 5, 10))
+        compute = mock.Mock(return_value='new')
+        with mock.patch('core.stampede.random.random',
+                        return_value=1 / math.e):
+            self.assertEqual(get_or_compute('key', compute, 60, beta=0.1),
+                             'old')
+            self.assertEqual(get_or_compute('key', compute, 60, beta=1),
+                             'new')
@@ -0,0 +1,233 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Task
+from posts.models import Comment, FeedItem, Follow, Group, Post, Tag
+from posts.tests.test_forms import SMALL_GIF, SMALL_GIF_NAME
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.source, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_posts(self, path, *args):
+        out, self.errors = StringIO(), StringIO()
+        call_command('import_posts', path, '--batch-size=2',
+                     f'--media-source={self.source}', *args,
+                     stdout=out, stderr=self.errors)
+        return out.getvalue()
+
+    def test_import_jsonl(self):
+        with open(os.path.join(self.source, 'small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        rows = [
+            {'text': 'Первый', 'author': 'auth', 'group': 'slug',
+             'pub_date': '2020-01-01T10:00:00', 'image': 'small.gif'},
+            {'text': 'Второй #импорт', 'author': 'auth'},
+            {'text': 'Новый автор', 'author': 'newbie'},
+            {'text': '', 'author': 'auth'},
+            {'text': 'Нет группы', 'author': 'auth', 'group': 'missing'},
+        ]
+        path = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        output = self.import_posts(path, '--create-authors')
+        self.assertIn('Готово: 3 постов', output)
+        first = Post.objects.get(text='Первый')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(first.image.name, SMALL_GIF_NAME)
+        self.assertTrue(
+            Task.objects.filter(name='posts.tasks.process_image',
+                                payload=json.dumps({'post_id': first.pk}))
+            .exists())
+        newbie = User.objects.get(username='newbie')
+        self.assertFalse(newbie.has_usable_password())
+        self.assertEqual(self.user.stats.posts_count, 2)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(FeedItem.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(Tag.objects.get(name='импорт').posts_count, 1)
+
+    def test_import_skips_bad_dates_and_old_posts(self):
+        with open(os.path.join(self.source, 'small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        path = self.write('posts.jsonl', json.dumps(
+            {'text': 'Старый', 'author': 'auth', 'image': 'small.gif'}))
+        self.import_posts(path)
+        Task.objects.all().delete()
+        rows = [
+            {'text': 'Повтор', 'author': 'auth', 'image': 'small.gif'},
+            {'text': 'Кривая дата', 'author': 'auth', 'pub_date': 'вчера'},
+        ]
+        path = self.write(
+            'more.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        output = self.import_posts(path)
+        self.assertIn('Готово: 1 постов', output)
+        self.assertIn("неверная дата 'вчера'", self.errors.getvalue())
+        self.assertFalse(Post.objects.filter(text='Кривая дата').exists())
+        repeat = Post.objects.get(text='Повтор')
+        self.assertEqual(repeat.image.name, SMALL_GIF_NAME)
+        self.assertEqual(
+            list(Task.objects.values_list('payload', flat=True)),
+            [json.dumps({'post_id': repeat.pk})])
+
+    def test_import_csv(self):
+        path = self.write(
+            'posts.csv',
+            'text,author,group\n'
+            'Пост из CSV,auth,slug\n'
+            'Чужой автор,nobody,\n'
+            'Новая группа,auth,fresh\n')
+        output = self.import_posts(path, '--create-groups')
+        self.assertIn('Готово: 2 постов', output)
+        self.assertTrue(Post.objects.filter(
+            text='Пост из CSV', group=self.group).exists())
+        self.assertEqual(Group.objects.get(slug='fresh').posts_count, 1)
+        self.assertFalse(User.objects.filter(username='nobody').exists())
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}',
+                                group=cls.group if number % 2 else None)
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export', *args, '--chunk-size=2', stdout=out)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_export_posts(self):
+        records = self.export()
+        self.assertEqual([record['id'] for record in records],
+                         [post.pk for post in self.posts])
+        self.assertEqual(records[1]['group'], 'slug')
+        self.assertEqual(records[1]['author'], 'auth')
+        self.assertEqual(records[1]['comments'][0]['text'], 'Комментарий')
+        self.assertEqual(records[0]['comments'], [])
+
+    def test_export_resumes_from_cursor(self):
+        records = self.export()
+        rest = self.export('--after', records[2]['cursor'])
+        self.assertEqual(rest, records[3:])
+
+    def test_export_rejects_bad_cursor(self):
+        with self.assertRaises(CommandError):
+            call_command('export', '--after', 'garbage', stdout=StringIO())
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:export'), {'after': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_follows(self):
+        self.assertEqual(self.export('follows'),
+                         [{'user': 'reader', 'author': 'auth'}])
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_endpoint(self):
+        url = reverse('posts:export')
+        self.assertEqual(Client().get(url).status_code, 302)
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(url)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        cursor = json.loads(lines[3])['cursor']
+        response = client.get(url, {'after': cursor})
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines(),
+            lines[4:])
+
+
+class WarmTemplatesTest(TestCase):
+    def test_templates_compiled_into_cache(self):
+        templates = [dict(settings.TEMPLATES[0], OPTIONS=dict(
+            settings.TEMPLATES[0]['OPTIONS'], loaders=[(
+                'django.template.loaders.cached.Loader',
+                settings.TEMPLATE_LOADERS)]))]
+        with self.settings(TEMPLATES=templates, TEMPLATE_CACHE=True):
+            out = StringIO()
+            call_command('warm_templates', stdout=out)
+            self.assertIn('Шаблонов:', out.getvalue())
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertIn('posts/index.html', {
+                template.origin.template_name
+                for template in loader.get_template_cache.values()})
+
+
+class RunTasksTest(TestCase):
+    def test_stale_running_tasks_requeued(self):
+        claimed_at = timezone.now() - timedelta(
+            seconds=settings.TASKS_LEASE_TIMEOUT + 1)
+        stale = Task.objects.create(
+            name='posts.tasks.missing', status=Task.RUNNING, attempts=1,
+            claimed_at=claimed_at)
+        exhausted = Task.objects.create(
+            name='posts.tasks.missing', status=Task.RUNNING,
+            attempts=settings.TASKS_MAX_ATTEMPTS, claimed_at=claimed_at)
+        active = Task.objects.create(
+            name='posts.tasks.missing', status=Task.RUNNING, attempts=1,
+            claimed_at=timezone.now())
+        call_command('run_tasks', '--once', stdout=StringIO())
+        # Брошенная задача снова выполнялась, пока не кончились попытки.
+        stale.refresh_from_db()
+        self.assertEqual(stale.attempts, settings.TASKS_MAX_ATTEMPTS)
+        self.assertIn('Неизвестная задача', stale.error)
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, Task.FAILED)
+        self.assertEqual(exhausted.error, 'Истёк срок выполнения')
+        self.assertEqual(Task.objects.get(pk=active.pk).status, Task.RUNNING)
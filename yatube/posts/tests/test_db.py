@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+
+from core import db
+from core.http import cache_anonymous
+from posts.models import Post
+from posts.tests.test_cache import LOCMEM_CACHES
+
+
+# TestCase держит открытую транзакцию, а в ней чтение идёт с основной базы.
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TransactionTestCase):
+    def setUp(self):
+        self.router = db.ReplicaRouter()
+        patcher = mock.patch('core.db.healthy_replicas',
+                             return_value=['replica'])
+        self.healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+        db.pin_primary(False)
+
+    def read_in_view(self, before=None):
+        @db.read_from_replicas
+        def view(request):
+            if before:
+                before()
+            return self.router.db_for_read(Post)
+        return view(None)
+
+    def test_reads_routed_to_replicas_only_in_marked_views(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.read_in_view(), 'replica')
+        self.healthy.return_value = []
+        self.assertEqual(self.read_in_view(), 'default')
+
+    def test_read_after_write_goes_to_primary(self):
+        self.assertEqual(self.read_in_view(
+            lambda: self.router.db_for_write(Post)), 'default')
+        db.pin_primary(False)
+        with transaction.atomic():
+            self.assertEqual(self.read_in_view(), 'default')
+        db.pin_primary(True)
+        self.assertEqual(self.read_in_view(), 'default')
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_page_cache_filled_from_primary(self):
+        @cache_anonymous()
+        @db.read_from_replicas
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Post))
+
+        request = RequestFactory().get('/cached/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).content, b'default')
+        self.assertEqual(self.read_in_view(), 'replica')
+
+    def test_write_pins_visitor_to_primary(self):
+        def write(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        request = RequestFactory().post('/')
+        response = db.PrimaryPinMiddleware(write)(request)
+        self.assertIn('primary_db', response.cookies)
+        request = RequestFactory().get('/')
+        response = db.PrimaryPinMiddleware(
+            lambda request: HttpResponse())(request)
+        self.assertNotIn('primary_db', response.cookies)
+
+    @override_settings(DATABASE_HEALTH_CHECK_INTERVAL=60)
+    def test_health_is_remembered(self):
+        with mock.patch.dict('core.db._health', clear=True), \
+                mock.patch('core.db.check_connection',
+                           return_value=False) as check:
+            self.assertFalse(db.is_healthy('replica'))
+            self.assertFalse(db.is_healthy('replica'))
+            check.assert_called_once_with('replica')
+
+
+class HealthTest(TestCase):
+    def test_health(self):
+        response = Client().get('/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'databases': {'default': True}})
+        with mock.patch('core.views.check_connection', return_value=False):
+            self.assertEqual(Client().get('/health/').status_code, 503)
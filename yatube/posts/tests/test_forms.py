@@ -1,17 +1,38 @@
+import hashlib
+import os
 import shutil
 import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from core.models import Blob, Task
+from core.storage import change_references
+from core.tasks import run_pending
+from core.views import serve_media
+from posts.forms import PostForm
 from posts.models import Group, Post
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp('dir=settings.BASE_DIR')
 
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+SMALL_GIF_NAME = f'posts/{hashlib.sha256(SMALL_GIF).hexdigest()}.gif'
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostFormTests(TestCase):
@@ -72,7 +93,7 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.count(), post_count + 1)
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.id, form_data['group'])
-        self.assertEqual(post.image.name, f'posts/{uploaded.name}')
+        self.assertEqual(post.image.name, SMALL_GIF_NAME)
 
     def test_check_edit_post(self):
         posts_count = Post.objects.count()
@@ -93,3 +114,125 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count)
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.id, form_data['group'])
+
+    def test_edit_keeps_image_replaced_by_worker(self):
+        post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, image='posts/raw.gif')
+        processed = 'posts/processed.gif'
+        is_valid = PostForm.is_valid
+
+        def worker_swaps_image(form):
+            # Воркер заменил картинку, пока форма редактирования
+            # обрабатывалась.
+            Post.objects.filter(pk=post.pk).update(image=processed)
+            change_references(processed, 1)
+            change_references('posts/raw.gif', -1)
+            return is_valid(form)
+
+        with mock.patch.object(PostForm, 'is_valid', worker_swaps_image):
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                data={'text': 'Новый текст'},
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.image.name, processed)
+        self.assertEqual(Blob.objects.get(name=processed).references, 1)
+
+    def test_thumbnails_generated_by_worker(self):
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertFalse(post.thumbnails_ready)
+        self.assertTrue(Task.objects.filter(status=Task.PENDING).exists())
+        run_pending()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertContains(response, 'loading="lazy"')
+        srcset = response.content.decode().split('srcset="')[1].split('"')[0]
+        self.assertEqual(
+            [variant.rsplit(' ', 1)[1] for variant in srcset.split(', ')],
+            ['320w', '640w', '960w', '1440w'])
+        image = srcset.split(', ')[0].rsplit(' ', 1)[0]
+        media = serve_media(RequestFactory().get(image),
+                            image[len(settings.MEDIA_URL):])
+        self.assertIn('immutable', media['Cache-Control'])
+        self.assertIn(f'max-age={settings.MEDIA_CACHE_MAX_AGE}',
+                      media['Cache-Control'])
+
+    def test_missing_thumbnails_not_generated_in_request(self):
+        post = Post.objects.create(
+            text='Старый пост', author=self.user, thumbnails_ready=True,
+            image=SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif'))
+        files = sum(len(names) for _, _, names in os.walk(TEMP_MEDIA_ROOT))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertNotContains(response, 'srcset=')
+        self.assertEqual(
+            sum(len(names) for _, _, names in os.walk(TEMP_MEDIA_ROOT)),
+            files)
+
+    @override_settings(POST_IMAGE_MAX_SIZE=(400, 400),
+                       POST_IMAGE_FORMAT='JPEG')
+    def test_image_optimized_by_worker(self):
+        exif = Image.Exif()
+        exif[0x010e] = 'Секретное описание'
+        source = BytesIO()
+        Image.new('RGBA', (1200, 300), (255, 0, 0, 128)).save(
+            source, 'PNG', exif=exif.tobytes())
+        for text in ('Первый пост', 'Второй пост'):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': text, 'image': SimpleUploadedFile(
+                    'big.png', source.getvalue(), 'image/png')},
+            )
+        original = Post.objects.get(text='Первый пост').image
+        original_path = original.path
+        self.assertTrue(os.path.exists(original_path))
+        run_pending()
+        first, second = Post.objects.filter(
+            text__in=('Первый пост', 'Второй пост'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image.name, f'posts/{first.image_hash}.jpg')
+        self.assertEqual(Blob.objects.get(name=first.image.name).references, 2)
+        self.assertEqual(Blob.objects.get(name=original.name).references, 0)
+        call_command('collect_media', '--grace=0', stdout=StringIO())
+        self.assertFalse(os.path.exists(original_path))
+        self.assertTrue(os.path.exists(first.image.path))
+        with Image.open(first.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (400, 100))
+            self.assertFalse(image.getexif())
+        self.assertTrue(first.thumbnails_ready)
+
+    def test_identical_uploads_share_file(self):
+        for text in ('Первый пост', 'Репост'):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': text, 'image': SimpleUploadedFile(
+                    'meme.gif', SMALL_GIF, 'image/gif')},
+            )
+        posts = Post.objects.filter(text__in=('Первый пост', 'Репост'))
+        self.assertEqual({post.image.name for post in posts},
+                         {SMALL_GIF_NAME})
+        path = posts[0].image.path
+        self.assertEqual(Blob.objects.get(name=SMALL_GIF_NAME).references, 2)
+        posts[0].delete()
+        call_command('collect_media', '--grace=0', stdout=StringIO())
+        self.assertTrue(os.path.exists(path))
+        Post.objects.filter(image=SMALL_GIF_NAME).delete()
+        self.assertEqual(Blob.objects.get(name=SMALL_GIF_NAME).references, 0)
+        call_command('collect_media', '--grace=0', stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(Blob.objects.filter(name=SMALL_GIF_NAME).exists())
@@ -0,0 +1,79 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN для SQLite')
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста', author=cls.author, group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Текст')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def plans_for(self, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [explain(query['sql']) for query in queries
+                if query['sql'].startswith('SELECT')
+                and f'FROM "{table}"' in query['sql']]
+
+    def test_views_use_indexes(self):
+        cases = (
+            (reverse('posts:index'), 'posts_post',
+             ('post_pub_date_idx', 'posts_post_updated')),
+            (reverse('posts:group_list', args=(self.group.slug,)),
+             'posts_post', 'post_group_pub_date_idx'),
+            (reverse('posts:profile', args=(self.author.username,)),
+             'posts_post',
+             'USING INDEX post_author_pub_date_idx (author_id=?)'),
+            (reverse('posts:profile', args=(self.author.username,)),
+             'posts_follow', 'sqlite_autoindex_posts_follow'),
+            (reverse('posts:post_detail', args=(self.post.pk,)),
+             'posts_comment', 'comment_post_created_idx'),
+            (reverse('posts:follow_index'),
+             'posts_feeditem', 'feed_user_pub_date_idx'),
+        )
+        for url, table, index in cases:
+            with self.subTest(url=url, table=table):
+                plans = self.plans_for(url, table)
+                self.assertTrue(plans)
+                indexes = index if isinstance(index, tuple) else (index,)
+                for plan in plans:
+                    self.assertTrue(
+                        any(name in plan for name in indexes), plan)
+
+    def test_follow_is_unique(self):
+        self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertEqual(
+            Follow.objects.filter(user=self.user, author=self.author).count(),
+            1)
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.markup import render_text
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class RenderTextTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='leo')
+
+    def test_markup(self):
+        html = render_text(
+            'Смотри https://example.com/a?b=1&c=2, #котики и @leo.\n'
+            'Привет, @nobody и mail@leo.ru\n\nВторой абзац')
+        self.assertIn('<a href="https://example.com/a?b=1&amp;c=2" '
+                      'rel="nofollow noopener">', html)
+        self.assertIn('c=2</a>, ', html)
+        self.assertIn('<a href="/tags/%D0%BA%D0%BE%D1%82%D0%B8%D0%BA%D0%B8/">'
+                      '#котики</a>', html)
+        self.assertIn('<a href="/profile/leo/">@leo</a>.<br>', html)
+        self.assertIn('@nobody', html)
+        self.assertNotIn('/profile/nobody/', html)
+        self.assertNotIn('/profile/leo.ru/', html)
+        self.assertIn('</p>\n\n<p>Второй абзац</p>', html)
+
+    def test_html_escaped(self):
+        html = render_text('<script>alert(1)</script> '
+                           'https://x.com/"onmouseover="alert(1)')
+        self.assertNotIn('<script>', html)
+        self.assertIn('&lt;script&gt;', html)
+        self.assertNotIn('"onmouseover', html)
+
+
+@override_settings(CACHES=settings.TEST_CACHES)
+class RenderedTextSaveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_forms_store_html(self):
+        self.client.post(reverse('posts:post_create'),
+                         {'text': 'Пост для @auth'})
+        post = Post.objects.get()
+        self.assertIn('<a href="/profile/auth/">@auth</a>', post.text_html)
+        self.client.post(reverse('posts:add_comment', args=(post.pk,)),
+                         {'text': 'Первая\nвторая'})
+        comment = Comment.objects.get()
+        self.assertEqual(comment.text_html, '<p>Первая<br>вторая</p>')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertContains(response, post.text_html, html=False)
+        self.assertContains(response, comment.text_html, html=False)
+
+    def test_save_renders_changed_text(self):
+        post = Post.objects.create(author=self.user, text='Привет, @auth')
+        self.assertIn('<a href="/profile/auth/">@auth</a>', post.text_html)
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).text_html,
+                         '<p>Новый текст</p>')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Было')
+        comment.text = 'Стало'
+        comment.save()
+        self.assertEqual(Comment.objects.get().text_html, '<p>Стало</p>')
+
+    def test_backfill(self):
+        post = Post.objects.create(author=self.user, text='#старый пост')
+        Comment.objects.create(post=post, author=self.user, text='<b>')
+        # Записи, сохранённые до появления text_html.
+        Post.objects.update(text_html='')
+        Comment.objects.update(text_html='')
+        out = StringIO()
+        call_command('render_texts', stdout=out)
+        self.assertIn('Постов: 1, комментариев: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertIn('#старый</a>', post.text_html)
+        self.assertEqual(post.version, 3)
+        self.assertEqual(Comment.objects.get().text_html, '<p>&lt;b&gt;</p>')
+        call_command('render_texts', stdout=out)
+        self.assertIn('Постов: 0, комментариев: 0', out.getvalue())
@@ -0,0 +1,38 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(CACHES=settings.TEST_CACHES)
+class RequestMetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(text='Текст поста', author=cls.user)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+    def test_metrics_reported(self):
+        with self.assertLogs('core.metrics', level='INFO') as logs:
+            response = Client().get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('cache;desc=', timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], reverse('posts:index'))
+        self.assertEqual(record['status'], 200)
+        self.assertGreaterEqual(record['queries'], 1)
+        self.assertTrue(record['slowest'])
+        self.assertGreaterEqual(record['cache_misses'], 1)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_disabled_without_header(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -50,3 +53,92 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='first',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='second',
+            description='Тестовое описание',
+        )
+
+    def refresh(self, *objects):
+        for obj in objects:
+            obj.refresh_from_db()
+
+    def test_counters_follow_changes(self):
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.group)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.refresh(post, self.group)
+        self.assertEqual(self.user.stats.posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        stats = AuthorStats.objects.get(user=self.user)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.refresh(self.group, self.other_group)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        comment.delete()
+        self.refresh(post)
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.refresh(self.other_group, stats)
+        self.assertEqual(self.other_group.posts_count, 0)
+        self.assertEqual(stats.posts_count, 0)
+
+    def test_recount_repairs_drift(self):
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.group)
+        Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.user)
+        AuthorStats.objects.update(
+            posts_count=7, followers_count=7, following_count=7,
+            posts_updated=None)
+        Group.objects.update(posts_count=7, posts_updated=None)
+        Post.objects.update(comments_count=7)
+        call_command('recount', stdout=StringIO())
+        stats = AuthorStats.objects.get(user=self.user)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (1, 1, 0))
+        self.refresh(post, self.group, self.other_group)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.other_group.posts_count, 0)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(stats.posts_updated, post.updated)
+        self.assertEqual(self.group.posts_updated, post.updated)
+        self.assertIsNone(self.other_group.posts_updated)
+
+    def test_delete_with_drifted_counters(self):
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.group)
+        Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        AuthorStats.objects.update(posts_count=0)
+        Group.objects.update(posts_count=0)
+        Post.objects.update(comments_count=0)
+        post.delete()
+        self.assertFalse(Post.objects.exists())
+        self.refresh(self.group)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).posts_count, 0)
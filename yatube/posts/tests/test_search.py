@@ -0,0 +1,91 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.paginator import NEXT, encode_cursor
+from posts.models import Group, Post
+from posts.search import FTS_TABLE, filter_posts
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+@override_settings(PER_PAGE=2)
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.best = Post.objects.create(
+            author=cls.user, group=cls.group,
+            text='Котики, котики и ещё раз котики')
+        cls.good = Post.objects.create(
+            author=cls.user, text='Пост про котиков и собак')
+        cls.other_post = Post.objects.create(
+            author=cls.other, text='Котик соседа')
+        Post.objects.create(author=cls.user, text='Совсем про другое')
+
+    def search(self, **params):
+        response = Client().get(reverse('posts:search'), params)
+        return response, list(response.context.get('page_obj') or [])
+
+    def test_results_are_ranked(self):
+        response, posts = self.search(q='котик')
+        # Короткий пост с тем же словом ранжируется выше длинного.
+        self.assertEqual(posts, [self.best, self.other_post])
+        next_page = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA'
+                                      f'&cursor={next_page}')
+        response, posts = self.search(q='котик', cursor=next_page)
+        self.assertEqual(posts, [self.good])
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_date_cursor_returns_first_page(self):
+        cursor = encode_cursor(NEXT, self.good, 2)
+        response, posts = self.search(q='котик', cursor=cursor)
+        self.assertEqual(posts, [self.best, self.other_post])
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_filters(self):
+        _, posts = self.search(q='котик', group=self.group.pk)
+        self.assertEqual(posts, [self.best])
+        _, posts = self.search(q='котик', author='other')
+        self.assertEqual(posts, [self.other_post])
+
+    def test_query_syntax_is_escaped(self):
+        response, posts = self.search(q='"котик* OR (NEAR')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(posts, [])
+        response, posts = self.search(q='!!!')
+        self.assertEqual(posts, [])
+
+    def test_index_follows_changes(self):
+        post = Post.objects.get(pk=self.good.pk)
+        post.text = 'Теперь только про собак'
+        post.save()
+        Post.objects.filter(pk=self.other_post.pk).delete()
+        _, posts = self.search(q='котик')
+        self.assertEqual(posts, [self.best])
+        _, posts = self.search(q='собак')
+        self.assertEqual(posts, [self.good])
+
+    def test_admin_uses_index(self):
+        found = filter_posts(Post.objects.all(), 'собак')
+        self.assertIn(FTS_TABLE, str(found.query))
+        self.assertEqual(list(found), [self.good])
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        response = client.get('/admin/posts/post/', {'q': 'котик'})
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.best, self.good, self.other_post})
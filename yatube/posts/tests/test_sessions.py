@@ -0,0 +1,77 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.tests.test_cache import LOCMEM_CACHES
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    USER_CACHE_TIMEOUT=600,
+)
+class CachedAuthTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='auth', password='old-password')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='auth', password='old-password')
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries
+                          if 'django_session' in query['sql']
+                          or 'FROM "auth_user"' in query['sql']]
+
+    def test_steady_state_without_auth_queries(self):
+        url = reverse('posts:follow_index')
+        self.client.get(url)
+        response, queries = self.auth_queries(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_password_change_drops_cached_user(self):
+        url = reverse('posts:follow_index')
+        self.client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-password')
+        user.save()
+        response = self.client.get(url)
+        self.assertRedirects(response, f'/auth/login/?next={url}')
+
+    def test_sessions_of_plain_model_backend_stay_valid(self):
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+
+
+class SessionPurgeTest(TestCase):
+    def test_run_tasks_purges_expired_sessions(self):
+        Session.objects.create(
+            session_key='expired', session_data='',
+            expire_date=timezone.now() - timedelta(days=1))
+        Session.objects.create(
+            session_key='active', session_data='',
+            expire_date=timezone.now() + timedelta(days=1))
+        call_command('run_tasks', '--once', stdout=StringIO())
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['active'])
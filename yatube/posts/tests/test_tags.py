@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import tags
+from posts.counters import recount
+from posts.models import Post, PostTag, Tag
+
+User = get_user_model()
+
+
+@override_settings(CACHES=settings.TEST_CACHES, PER_PAGE=2)
+class TagTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=text) for text in (
+                'Про #Котиков и #python',
+                'Снова #котиков',
+                '#котиков много не бывает, #котиков',
+                'Без тегов',
+            )
+        ]
+
+    def counts(self):
+        return dict(Tag.objects.values_list('name', 'posts_count'))
+
+    def test_tags_extracted_on_save(self):
+        self.assertEqual(self.counts(), {'котиков': 3, 'python': 1})
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.text = 'Теперь про #django'
+        post.save()
+        self.assertEqual(
+            self.counts(), {'котиков': 2, 'python': 0, 'django': 1})
+        Post.objects.filter(pk=self.posts[1].pk).delete()
+        self.assertEqual(self.counts()['котиков'], 1)
+
+    def test_url_fragments_are_not_tags(self):
+        self.assertEqual(
+            tags.extract('См. http://x.com/#intro и http://x.com/?q=#foo '
+                         'про #Django'),
+            {'django'})
+
+    def test_recount(self):
+        Tag.objects.update(posts_count=0)
+        recount()
+        self.assertEqual(self.counts(), {'котиков': 3, 'python': 1})
+
+    def test_tag_page(self):
+        url = reverse('posts:tag_posts', args=('Котиков',))
+        response = Client().get(url)
+        self.assertEqual(response.context['tag'].name, 'котиков')
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.posts[2], self.posts[1]])
+        self.assertEqual(response.context['popular_tags'][0].name, 'котиков')
+        cursor = response.context['page_obj'].next_cursor
+        response = Client().get(url, {'cursor': cursor})
+        self.assertEqual(list(response.context['page_obj']), [self.posts[0]])
+        self.assertEqual(
+            Client().get(reverse('posts:tag_posts', args=('нет',)))
+            .status_code, 404)
+
+    def test_tag_feed_uses_index(self):
+        tag = Tag.objects.get(name='котиков')
+        plan = ' '.join(str(row) for row in PostTag.objects.filter(
+            tag=tag).order_by('-pub_date', '-post').explain().splitlines())
+        self.assertIn('post_tag_pub_date_idx', plan)
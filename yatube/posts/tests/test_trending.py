@@ -0,0 +1,133 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Follow, Group, Post, PostTrend
+from posts.tests.test_cache import LOCMEM_CACHES
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TRENDING_HALF_LIFE=3600,
+                   TRENDING_FOLLOWER_WEIGHT=0)
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other = Group.objects.create(title='Другая', slug='other')
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.user, text='Да')
+
+    def cached_posts(self):
+        return trending.ordered(
+            cache.get(trending.TRENDING_KEY)['posts'], timezone.now())
+
+    def test_events_recorded(self):
+        post = Post.objects.create(author=self.user, text='Пост')
+        self.assertAlmostEqual(post.trend.score, 1)
+        self.comment(post, 2)
+        post.trend.refresh_from_db()
+        self.assertAlmostEqual(post.trend.score, 3, places=3)
+        score, _ = cache.get(trending.TRENDING_KEY)['posts'][post.pk]
+        self.assertAlmostEqual(score, post.trend.score)
+
+    def test_decay_ranks_recent_activity_higher(self):
+        now = timezone.now()
+        old = Post.objects.create(author=self.user, text='Старый')
+        fresh = Post.objects.create(author=self.user, text='Свежий')
+        PostTrend.objects.filter(post=old).update(
+            score=3, scored_at=now - timedelta(hours=2))
+        PostTrend.objects.filter(post=fresh).update(score=1, scored_at=now)
+        self.assertAlmostEqual(
+            trending.decay(4, now - timedelta(hours=2), now), 1)
+        self.assertEqual(trending.ordered(trending.rank(now)['posts'], now),
+                         [fresh.pk, old.pk])
+
+    @override_settings(TRENDING_FOLLOWER_WEIGHT=1)
+    def test_followers_weight(self):
+        popular = User.objects.create_user(username='popular')
+        Follow.objects.create(user=self.user, author=popular)
+        loud = Post.objects.create(author=popular, text='Громкий')
+        quiet = Post.objects.create(author=self.user, text='Тихий')
+        self.assertEqual(self.cached_posts(), [loud.pk, quiet.pk])
+        self.assertGreater(loud.trend.score, quiet.trend.score)
+
+    def test_groups_ranked_by_total_score(self):
+        Post.objects.create(author=self.user, text='1', group=self.group)
+        Post.objects.create(author=self.user, text='2', group=self.group)
+        busy = Post.objects.create(author=self.user, text='3',
+                                   group=self.other)
+        Post.objects.create(author=self.user, text='Без группы')
+        self.comment(busy, 2)
+        now = timezone.now()
+        for ranking in (cache.get(trending.TRENDING_KEY),
+                        trending.rank(now)):
+            self.assertEqual(trending.ordered(ranking['groups'], now),
+                             [self.other.pk, self.group.pk])
+            self.assertEqual(trending.ordered(ranking['posts'], now)[0],
+                             busy.pk)
+
+    @override_settings(TRENDING_SIZE=2)
+    def test_size_limit(self):
+        posts = [Post.objects.create(author=self.user, text=str(number))
+                 for number in range(3)]
+        self.comment(posts[1], 2)
+        self.comment(posts[2])
+        self.assertEqual(self.cached_posts(), [posts[1].pk, posts[2].pk])
+        # Вытесненный пост возвращается в список с полным весом из базы.
+        self.comment(posts[0], 3)
+        self.assertEqual(self.cached_posts(), [posts[0].pk, posts[1].pk])
+
+    def test_prune_drops_rows_outside_window(self):
+        old = Post.objects.create(author=self.user, text='Старый')
+        Post.objects.create(author=self.user, text='Свежий')
+        PostTrend.objects.filter(post=old).update(
+            scored_at=timezone.now() - timedelta(days=30))
+        self.assertNotIn(old.pk, trending.rank()['posts'])
+        self.assertEqual(trending.prune(), 1)
+        self.assertFalse(PostTrend.objects.filter(post=old).exists())
+
+    def test_page_served_from_cache(self):
+        post = Post.objects.create(author=self.user, text='Первый',
+                                   group=self.group)
+        url = reverse('posts:trending')
+        response = Client().get(url)
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.assertEqual(response.context['groups'], [self.group])
+        second = Post.objects.create(author=self.user, text='Второй')
+        response = Client().get(url)
+        self.assertEqual(list(response.context['page_obj']), [second, post])
+        out = StringIO()
+        call_command('update_trending', stdout=out)
+        self.assertIn('В тренде постов: 2, групп: 1', out.getvalue())
+
+    def test_page_rebuilt_after_cache_miss(self):
+        post = Post.objects.create(author=self.user, text='Первый',
+                                   group=self.group)
+        second = Post.objects.create(author=self.user, text='Второй')
+        url = reverse('posts:trending')
+        # Кэш другого процесса или сброшенный кэш: список собирается
+        # по базе и остаётся в кэше для следующих запросов.
+        cache.clear()
+        response = Client().get(url)
+        self.assertEqual(list(response.context['page_obj']), [second, post])
+        self.assertEqual(response.context['groups'], [self.group])
+        self.assertEqual(self.cached_posts(), [second.pk, post.pk])
+        # Событие при пустом кэше не затирает остальной список.
+        cache.clear()
+        third = Post.objects.create(author=self.user, text='Третий')
+        self.assertEqual(self.cached_posts(),
+                         [third.pk, second.pk, post.pk])
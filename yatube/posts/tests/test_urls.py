@@ -1,13 +1,15 @@
 from http import HTTPStatus
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 
 from posts.models import Group, Post
 
 User = get_user_model()
 
 
+@override_settings(CACHES=settings.TEST_CACHES)
 class StaticURLTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -43,6 +45,7 @@ class StaticURLTests(TestCase):
             (f'/group/{cls.group.slug}/'): 'posts/group_list.html',
             (f'/profile/{cls.user_no_name}/'): 'posts/profile.html',
             (f'/posts/{cls.post.id}/'): 'posts/post_detail.html',
+            '/search/': 'posts/search.html',
         }
 
     def setUp(self):
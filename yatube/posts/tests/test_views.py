@@ -1,3 +1,5 @@
+import base64
+import json
 import shutil
 import tempfile
 import PIL
@@ -7,13 +9,24 @@ from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Paginator
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Comment, Follow, Group, Post
+from core.tasks import run_pending
+from posts.models import (AuthorStats, Comment, FeedItem, Follow, Group,
+                          Post)
+from posts.tests.test_cache import LOCMEM_CACHES
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+
+def token(payload):
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
 User = get_user_model()
 
 
@@ -136,6 +149,7 @@ class ViewPagesTests(TestCase):
         self.assertNotContains(response_no_cache, 'cache_test')
 
 
+@override_settings(CACHES=settings.TEST_CACHES)
 class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -158,6 +172,48 @@ class PaginatorViewsTest(TestCase):
             + f'?page={paginat.num_pages}')
         self.assertEqual(len(response.context['page_obj']), page_two)
 
+    def test_cursor_pagination(self):
+        response = self.client.get(reverse('posts:index'))
+        first_page = response.context['page_obj']
+        self.assertTrue(first_page.has_next())
+        self.assertIsNone(first_page.previous_cursor)
+        response = self.client.get(
+            reverse('posts:index') + f'?cursor={first_page.next_cursor}')
+        second_page = response.context['page_obj']
+        self.assertEqual(second_page.number, 2)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            list(first_page) + list(second_page),
+            list(Post.objects.order_by('-pub_date', '-pk')))
+        response = self.client.get(
+            reverse('posts:index') + f'?cursor={second_page.previous_cursor}')
+        self.assertEqual(list(response.context['page_obj']), list(first_page))
+
+    def test_cursor_page_without_count(self):
+        response = self.client.get(reverse('posts:index'))
+        cursor = response.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index') + f'?cursor={cursor}')
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?cursor=bad')
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        value = Post.objects.first().pub_date.isoformat()
+        for query in (f'cursor={token(["n", value, 10 ** 30, 2])}',
+                      f'cursor={token(["n", value, 1, 10 ** 30])}',
+                      f'page={10 ** 30}',
+                      # Число вместо даты в курсоре ленты тоже не годится.
+                      f'cursor={token(["n", 1.5, 3, 2])}'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:index') + '?' + query)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
+
 
 @override_settings(CACHES=settings.TEST_CACHES)
 class FollowTest(TestCase):
@@ -211,3 +267,168 @@ class FollowTest(TestCase):
                                    follow=True)
         response = self.authorized_client.get(reverse('posts:follow_index'))
         self.assertEqual(response.context.get('page_obj')[0], self.post)
+
+    def test_feed_materialized_on_write(self):
+        Follow.objects.create(user=self.user1, author=self.user2)
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.user1, post=self.post).exists())
+        new_post = Post.objects.create(text='Новый пост', author=self.user2)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.post])
+        Follow.objects.filter(user=self.user1, author=self.user2).delete()
+        self.assertFalse(FeedItem.objects.filter(user=self.user1).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_feed_pulls_prolific_authors(self):
+        Follow.objects.create(user=self.user1, author=self.user2)
+        new_post = Post.objects.create(text='Новый пост', author=self.user2)
+        self.assertFalse(FeedItem.objects.exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_feed_keeps_posts_after_author_unpulled(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.user1, author=self.user2)
+        Follow.objects.create(user=reader, author=self.user2)
+        run_pending()
+        self.assertFalse(FeedItem.objects.exists())
+        new_post = Post.objects.create(text='Новый пост', author=self.user2)
+        Follow.objects.filter(user=reader).delete()
+        # Пока задача не разложила посты, они читаются напрямую.
+        self.assertFalse(FeedItem.objects.exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.post])
+        run_pending()
+        self.assertEqual(
+            set(FeedItem.objects.values_list('user_id', 'post_id')),
+            {(self.user1.pk, self.post.pk), (self.user1.pk, new_post.pk)})
+        self.assertFalse(AuthorStats.objects.get(user=self.user2).pull_feed)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.post])
+
+
+@override_settings(CACHES=settings.TEST_CACHES)
+class QueryCountTest(TestCase):
+    """Число запросов каждой страницы не зависит от объёма данных."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for number in range(15):
+            Post.objects.create(
+                text=f'Текст {number}', author=cls.author, group=cls.group)
+        cls.post = Post.objects.first()
+        for number in range(10):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'commenter{number}'),
+                text=f'Комментарий {number}',
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_views_query_count(self):
+        pages = (
+            # Первый запрос у страниц ленты — валидаторы ETag.
+            (reverse('posts:index'), 4),
+            (reverse('posts:group_list', args=(self.group.slug,)), 5),
+            (reverse('posts:profile', args=(self.author.username,)), 6),
+            (reverse('posts:post_detail', args=(self.post.pk,)), 5),
+            (reverse('posts:follow_index'), 4),
+        )
+        for url, queries in pages:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.authorized_client.get(url)
+
+    def test_unchanged_pages_not_modified(self):
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = Client().get(url)
+                etag = response['ETag']
+                self.assertIn('Cookie', response['Vary'])
+                with self.assertNumQueries(1):
+                    response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_csrf_cookie_updates_etag(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 32
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # После входа токен другой, и формы старой копии не пройдут.
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 32
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    # Удаление поста меняет ETag главной через версию кэша ленты.
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_changes_update_etag(self):
+        cache.clear()
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = Client().get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='Новый')
+        self.assertEqual(
+            Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        url = reverse('posts:index')
+        etag = Client().get(url)['ETag']
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(
+            Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    # Группа и профиль берут время изменения постов из своих строк.
+    def test_post_edit_updates_group_and_profile_etag(self):
+        pages = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        etags = [Client().get(url)['ETag'] for url in pages]
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        for url, etag in zip(pages, etags):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                    200)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_updated,
+                         self.post.updated)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_updated,
+            self.post.updated)
+
+    @override_settings(COMMENTS_PER_PAGE=4)
+    def test_comments_paginated(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        response = self.authorized_client.get(url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'Комментарий {number}' for number in range(4)])
+        self.assertEqual(response.context['post_count'], 15)
+        response = self.authorized_client.get(
+            url + f'?comments={comments.next_cursor}')
+        self.assertEqual(response.context['comments'][0].text,
+                         'Комментарий 4')
@@ -0,0 +1,160 @@
+"""Лента «В тренде».
+
+Публикация поста и каждый комментарий добавляют вес в ``PostTrend``
+поста; вес события умножается на множитель от числа подписчиков
+автора, а накопленный вес затухает вдвое за ``TRENDING_HALF_LIFE``
+секунд, поэтому недавняя активность важнее старой.
+
+В кэше лежат лучшие ``TRENDING_SIZE`` постов и групп с весами.
+Каждое событие обновляет их на месте, поэтому страница берёт список
+из кэша и читает из базы лишь посты своей страницы. Если списка
+в кэше нет (кэш процесса пуст или сброшен), его один раз собирает
+по базе первый запрос. Команда ``update_trending`` время от времени
+пересобирает список по всем строкам за окно ``TRENDING_WINDOW``
+и исправляет то, что упустили события: вытесненные группы
+и обновления, пропущенные из-за блокировки.
+"""
+import heapq
+import math
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils import timezone
+
+from core.stampede import lock_key, single_flight
+
+from .models import AuthorStats, Group, Post, PostTrend
+
+TRENDING_KEY = 'posts:trending'
+
+
+def decay(score, scored_at, now):
+    age = (now - scored_at).total_seconds()
+    return score * 0.5 ** (max(age, 0) / settings.TRENDING_HALF_LIFE)
+
+
+def author_weight(followers):
+    return 1 + settings.TRENDING_FOLLOWER_WEIGHT * math.log1p(followers or 0)
+
+
+def best(entries, size, now):
+    """Лучшие ``size`` записей ``{id: (вес, время веса)}``."""
+    return dict(heapq.nlargest(
+        size, entries.items(),
+        key=lambda item: decay(*item[1], now)))
+
+
+def ordered(entries, now):
+    return sorted(entries, key=lambda pk: decay(*entries[pk], now),
+                  reverse=True)
+
+
+def update_ranking(post_id, group_id, score, weight, now):
+    """Ставит пост с весом ``score`` в список и добавляет ``weight``
+    группе. Если список сейчас обновляет другой процесс, событие
+    подхватит ближайший ``update_trending``."""
+    lock = lock_key(TRENDING_KEY)
+    if not cache.add(lock, 1, settings.CACHE_LOCK_TIMEOUT):
+        return
+    try:
+        # Без списка в кэше событие ложится в список, собранный по базе,
+        # а не в пустой.
+        ranking = cache.get(TRENDING_KEY) or rank(now)
+        size = settings.TRENDING_SIZE
+        ranking['posts'][post_id] = score, now
+        ranking['posts'] = best(ranking['posts'], size, now)
+        if group_id is not None:
+            total, scored_at = ranking['groups'].get(group_id, (0, now))
+            ranking['groups'][group_id] = (
+                decay(total, scored_at, now) + weight, now)
+            ranking['groups'] = best(ranking['groups'], size, now)
+        store(ranking)
+    finally:
+        cache.delete(lock)
+
+
+def record_post(post):
+    followers = AuthorStats.objects.filter(
+        user_id=post.author_id).values_list(
+        'followers_count', flat=True).first()
+    weight = settings.TRENDING_POST_WEIGHT * author_weight(followers)
+    PostTrend.objects.create(post=post, score=weight,
+                             scored_at=post.pub_date)
+    update_ranking(post.pk, post.group_id, weight, weight, post.pub_date)
+
+
+def record_comment(comment):
+    now = timezone.now()
+    group_id, followers = Post.objects.filter(
+        pk=comment.post_id).values_list(
+        'group_id', 'author__stats__followers_count').get()
+    weight = settings.TRENDING_COMMENT_WEIGHT * author_weight(followers)
+    with transaction.atomic():
+        trend, created = PostTrend.objects.select_for_update().get_or_create(
+            post_id=comment.post_id, defaults={'scored_at': now})
+        trend.score = decay(trend.score, trend.scored_at, now) + weight
+        trend.scored_at = now
+        trend.save()
+    update_ranking(comment.post_id, group_id, trend.score, weight, now)
+
+
+def rank(now=None):
+    """Список заново по всем строкам за окно тренда."""
+    now = now or timezone.now()
+    rows = PostTrend.objects.filter(
+        scored_at__gte=now - timedelta(seconds=settings.TRENDING_WINDOW),
+    ).values_list('post_id', 'post__group_id', 'score', 'scored_at')
+    posts = []
+    groups = Counter()
+    for post_id, group_id, score, scored_at in rows.iterator():
+        score = decay(score, scored_at, now)
+        posts.append((score, post_id))
+        if group_id is not None:
+            groups[group_id] += score
+    size = settings.TRENDING_SIZE
+    return {
+        'posts': {pk: (score, now)
+                  for score, pk in heapq.nlargest(size, posts)},
+        'groups': {pk: (score, now)
+                   for pk, score in groups.most_common(size)},
+    }
+
+
+def prune(now=None):
+    now = now or timezone.now()
+    deleted, _ = PostTrend.objects.filter(
+        scored_at__lt=now - timedelta(seconds=settings.TRENDING_WINDOW),
+    ).delete()
+    return deleted
+
+
+def store(ranking):
+    cache.set(TRENDING_KEY, ranking, None)
+
+
+def refresh():
+    ranking = rank()
+    store(ranking)
+    return ranking
+
+
+def trending_page(number):
+    """Страница постов в тренде и список групп в тренде. Порядок
+    берётся из кэша, а при промахе список собирает по базе один
+    процесс, остальные ждут его результат."""
+    now = timezone.now()
+    ranking = cache.get(TRENDING_KEY)
+    if ranking is None:
+        ranking = single_flight(TRENDING_KEY, rank, store)
+    page = Paginator(ordered(ranking['posts'], now),
+                     settings.PER_PAGE).get_page(number)
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        page.object_list)
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    group_ids = ordered(ranking['groups'], now)[:settings.TRENDING_GROUPS]
+    groups = Group.objects.in_bulk(group_ids)
+    return page, [groups[pk] for pk in group_ids if pk in groups]
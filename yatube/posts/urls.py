@@ -7,6 +7,8 @@ app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('trending/', views.trending, name='trending'),
+    path('tags/<str:tag>/', views.tag_posts, name='tag_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
@@ -15,6 +17,8 @@ urlpatterns = [
          views.add_comment,
          name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('export/posts/', views.export, name='export'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
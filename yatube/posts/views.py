@@ -1,25 +1,61 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from core.db import read_from_replicas
+from core.http import cache_anonymous, conditional
+from core.paginator import CursorPaginator
+
+from .cache import feed_version
+from .conditions import (group_state, index_state, post_state,
+                         profile_state, tag_state)
+from .counters import author_posts_count, author_stats
+from .export import export_posts
+from .feed import follow_feed, to_posts
+from .forms import CommentForm, PostForm, SearchForm
+from .models import Follow, Group, Post, Tag, User
+from .pages import feed_page, post_page, profile_page
+from .search import search_posts
+from .tags import normalize, popular_tags
+from .trending import trending_page
+from .tasks import process_image
+
+
+def get_paginator(queryset, request, **options):
+    paginator = CursorPaginator(
+        queryset,
+        settings.PER_PAGE,
+        **options,
+        approximate_count=settings.PAGINATOR_APPROXIMATE_COUNT,
+        count_limit=settings.PAGINATOR_COUNT_LIMIT,
+    )
+    return paginator.get_page_for(request)
 
 
-def get_paginator(queryset, request):
-    paginator = Paginator(queryset, settings.PER_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+def schedule_image_processing(post):
+    if post.image:
+        process_image.delay(post_id=post.pk)
 
 
+@cache_anonymous(feed_page)
+@read_from_replicas
+@conditional(index_state)
 def index(request):
     page = get_paginator(
         Post.objects.select_related(
             'author', 'group'), request)
-    return render(request, 'posts/index.html', {'page_obj': page})
+    context = {
+        'page_obj': page,
+        'feed_version': feed_version(),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/index.html', context)
 
 
+@cache_anonymous(feed_page)
+@read_from_replicas
+@conditional(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     page = get_paginator(
@@ -32,30 +68,68 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replicas
+def trending(request):
+    page, groups = trending_page(request.GET.get('page'))
+    context = {
+        'page_obj': page,
+        'groups': groups,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@cache_anonymous(feed_page)
+@read_from_replicas
+@conditional(tag_state)
+def tag_posts(request, tag):
+    tag = get_object_or_404(Tag, name=normalize(tag))
+    page = get_paginator(
+        tag.post_tags.select_related('post__author', 'post__group'),
+        request, tiebreak='post_id', transform=to_posts)
+    context = {
+        'tag': tag,
+        'page_obj': page,
+        'popular_tags': popular_tags(),
+    }
+    return render(request, 'posts/tag.html', context)
+
+
+@cache_anonymous(profile_page)
+@read_from_replicas
+@conditional(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
     post_list = author.posts.select_related('author', 'group')
     page = get_paginator(post_list, request)
     following = request.user.is_authenticated and author.following.filter(
         user=request.user).exists()
     context = {
         'author': author,
-        'post_count': page.paginator.count,
+        'stats': author_stats(author),
+        'post_count': author_posts_count(author),
         'page_obj': page,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@cache_anonymous(post_page)
+@read_from_replicas
+@conditional(post_state)
 def post_detail(request, post_id):
     post = get_object_or_404(
         Post.objects.select_related(
-            'author', 'group'), pk=post_id)
-    comments = post.comments.all()
-    posts_count = post.author.posts.count()
+            'author__stats', 'group'), pk=post_id)
+    comments = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        field='created',
+        descending=False,
+    ).get_page_for(request, param='comments', page_param=None)
     context = {
         'comments': comments,
-        'post_count': posts_count,
+        'post_count': author_posts_count(post.author),
         'post': post,
         'form': CommentForm(),
     }
@@ -71,6 +145,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author_id = request.user.id
             post.save()
+            schedule_image_processing(post)
             return redirect('posts:profile', request.user.username)
         return render(request, template, {'form': form})
     form = PostForm()
@@ -88,7 +163,17 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        # Картинку и счётчики мог поменять воркер, пока шёл запрос:
+        # пишем только то, что меняет форма, иначе вернётся старое имя
+        # файла, а collect_media удалит файл, на который ещё ссылаются.
+        fields = ['text', 'text_html', 'group', 'updated', 'version']
+        if 'image' in form.changed_data:
+            post.thumbnails_ready = False
+            fields += ['image', 'thumbnails_ready']
+        post.save(update_fields=fields)
+        if 'image' in form.changed_data:
+            schedule_image_processing(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -112,13 +197,25 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    page = get_paginator(
-        Post.objects.filter(
-            author__following__user=request.user),
-        request)
+    queryset, options = follow_feed(request.user)
+    page = get_paginator(queryset, request, **options)
     return render(request, 'posts/follow.html', {'page_obj': page})
 
 
+@login_required
+def export(request):
+    try:
+        lines = export_posts(request.GET.get('after'))
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        lines,
+        content_type='application/x-ndjson; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'attachment; filename="posts.jsonl"'
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -135,3 +232,20 @@ def profile_unfollow(request, username):
                                        user=request.user)
     profile_follow.delete()
     return redirect('posts:profile', username=username)
+
+
+def search(request):
+    form = SearchForm(request.GET or None)
+    context = {'form': form}
+    if form.is_valid():
+        queryset, options = search_posts(
+            form.cleaned_data['q'],
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author'],
+        )
+        query = request.GET.copy()
+        query.pop('cursor', None)
+        query.pop('page', None)
+        context['page_obj'] = get_paginator(queryset, request, **options)
+        context['query'] = query.urlencode()
+    return render(request, 'posts/search.html', context)
@@ -0,0 +1,28 @@
+"""Загрузка вошедшего пользователя из кэша.
+
+``AuthenticationMiddleware`` достаёт пользователя из базы на каждый
+запрос. ``CachedModelBackend`` держит его в кэше
+``USER_CACHE_TIMEOUT`` секунд; запись удаляется при сохранении
+пользователя, в том числе при смене пароля, поэтому старые сессии
+сразу перестают проходить проверку.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'users:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if not settings.USER_CACHE_TIMEOUT:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
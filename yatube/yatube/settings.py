@@ -4,6 +4,12 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def env_flag(name, default):
+    """Флаг из окружения: ``1``, ``true`` и ``yes`` в любом регистре."""
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -15,7 +21,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_flag('DEBUG', True)
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -27,6 +33,68 @@ ALLOWED_HOSTS = [
 # Вывод по 10 записей на страницу
 PER_PAGE = 10
 
+# Комментариев на странице поста
+COMMENTS_PER_PAGE = 50
+
+# Популярных тегов на странице тега
+POPULAR_TAGS_LIMIT = 20
+
+# Лента «В тренде»: вес активности затухает вдвое за TRENDING_HALF_LIFE
+# секунд, учитывается активность за TRENDING_WINDOW секунд
+TRENDING_HALF_LIFE = 12 * 60 * 60
+TRENDING_WINDOW = 3 * 24 * 60 * 60
+TRENDING_POST_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_FOLLOWER_WEIGHT = 0.5
+TRENDING_SIZE = 100
+TRENDING_GROUPS = 10
+
+# Считать посты в ленте приблизительно: COUNT(*) не дальше лимита
+PAGINATOR_APPROXIMATE_COUNT = False
+PAGINATOR_COUNT_LIMIT = 1000
+
+# Лента подписок: авторов с большим числом подписчиков читаем напрямую,
+# при подписке переносим в ленту последние FEED_BACKFILL постов автора
+FEED_FANOUT_LIMIT = 5000
+FEED_BACKFILL = 1000
+FEED_BATCH_SIZE = 500
+
+# Очередь фоновых задач (manage.py run_tasks); EAGER — выполнять сразу
+TASKS_EAGER = False
+TASKS_MAX_ATTEMPTS = 3
+# Задача в статусе «Выполняется» дольше этого срока считается брошенной
+# упавшим воркером и возвращается в очередь
+TASKS_LEASE_TIMEOUT = 10 * 60
+
+# Загруженные картинки воркер уменьшает до POST_IMAGE_MAX_SIZE
+# и перекодирует (JPEG или WEBP, если Pillow собран с libwebp)
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+POST_IMAGE_FORMAT = os.getenv('POST_IMAGE_FORMAT', 'JPEG')
+POST_IMAGE_QUALITY = 82
+
+# Файл без ссылок manage.py collect_media удаляет не раньше, чем через
+# MEDIA_GC_GRACE секунд: за это время загрузку успевают сохранить в пост
+MEDIA_GC_GRACE = 60 * 60
+
+# Варианты картинки поста разной ширины для srcset, их готовит фоновый
+# воркер; POST_IMAGE_DEFAULT — вариант для src, POST_IMAGE_SIZES —
+# атрибут sizes: ширина картинки в ленте
+POST_THUMBNAILS = {
+    '320x113': {'crop': 'center', 'upscale': True},
+    '640x226': {'crop': 'center', 'upscale': True},
+    '960x339': {'crop': 'center', 'upscale': True},
+    '1440x509': {'crop': 'center', 'upscale': True},
+}
+POST_IMAGE_DEFAULT = '960x339'
+POST_IMAGE_SIZES = '(max-width: 992px) 100vw, 960px'
+
+# Имена медиафайлов — хэши содержимого (картинки постов и миниатюры
+# sorl), поэтому в DEBUG они отдаются с кэшированием на год
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Размер пачки при потоковой выгрузке (manage.py export, /export/)
+EXPORT_CHUNK_SIZE = 500
+
 # Перенаправлять пользователей для авторизации.
 LOGIN_URL = 'users:login'
 
@@ -39,6 +107,29 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # Указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Доля запросов, для которых собираются метрики SQL, шаблонов и кэша
+# (заголовок Server-Timing и лог core.metrics); 0 — выключено
+REQUEST_METRICS_SAMPLE_RATE = float(
+    os.getenv('REQUEST_METRICS_SAMPLE_RATE', '0'))
+REQUEST_METRICS_SLOW_QUERIES = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -56,7 +147,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,12 +161,22 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# В разработке шаблоны перечитываются с диска при каждом рендеринге.
+# С TEMPLATE_CACHE (по умолчанию без DEBUG) каждый шаблон разбирается
+# один раз на процесс, а wsgi.py компилирует их все при старте.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_CACHE = env_flag('TEMPLATE_CACHE', not DEBUG)
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_LOADERS),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -92,12 +195,39 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Основная база и реплики задаются переменными окружения DB_*.
+# DB_REPLICAS — через запятую хосты реплик, а для SQLite — пути к копиям
+# файла базы. Соединения живут DB_CONN_MAX_AGE секунд.
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        # В тестах реплики смотрят в тестовую основную базу.
+        TEST={'MIRROR': 'default'},
+        **{'NAME' if DB_ENGINE.endswith('sqlite3') else 'HOST':
+           location.strip()},
+    )
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+# Сколько секунд после записи посетитель читает с основной базы
+DATABASE_PIN_SECONDS = 10
+DATABASE_PIN_COOKIE = 'primary_db'
+# Как часто заново проверять, что реплика отвечает
+DATABASE_HEALTH_CHECK_INTERVAL = 30
 
 
 # Password validation
@@ -140,23 +270,77 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
-}
-
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Кэш выбирается переменной окружения CACHE_BACKEND. Общие для всех
+# процессов бэкенды позволяют держать ленту в кэше дольше: страницы
+# инвалидируются по версии при изменении постов и групп.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')),
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    # Требует пакет django-redis.
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
 }
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
+}
+
+# Сессии и вошедший пользователь читаются из кэша, если он общий для
+# всех процессов: иначе выход или смена пароля в одном процессе не были
+# бы видны в другом. Сессии при этом всё равно пишутся и в базу.
+CACHE_IS_SHARED = CACHE_BACKEND != 'locmem'
+SESSION_ENGINE = ('django.contrib.sessions.backends.cached_db'
+                  if CACHE_IS_SHARED else 'django.contrib.sessions.backends.db')
+# ModelBackend остаётся в списке для сессий, открытых до перехода на
+# CachedModelBackend: в них записан его путь, и без него их бы разлогинило.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TIMEOUT = 60 * 60 if CACHE_IS_SHARED else 0
+# Как часто run_tasks удаляет истёкшие сессии из базы, секунды
+SESSION_PURGE_INTERVAL = 60 * 60
+
+# Время жизни кэша ленты: у LocMemCache у каждого процесса своя копия
+# и своя версия, поэтому для него оставляем короткий срок
+FEED_CACHE_TIMEOUT = int(os.getenv(
+    'FEED_CACHE_TIMEOUT', 20 if CACHE_BACKEND == 'locmem' else 600))
+
+# Карточки постов кэшируются по версии поста и не устаревают,
+# поэтому срок может быть долгим для любого бэкенда
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Целые страницы для анонимных посетителей. Ключ включает версии
+# данных, срок выбирается так же, как для ленты.
+PAGE_CACHE_TIMEOUT = int(os.getenv(
+    'PAGE_CACHE_TIMEOUT', 20 if CACHE_BACKEND == 'locmem' else 600))
+
+# Защита от одновременного пересчёта (core.stampede): сколько ждать
+# процесс, который уже считает значение, сколько отдавать устаревшее
+# значение после мягкого срока и насколько рано пересчитывать заранее.
+CACHE_LOCK_TIMEOUT = 5
+CACHE_POLL_INTERVAL = 0.05
+CACHE_STALE_TIMEOUT = 60
+CACHE_EARLY_EXPIRATION_BETA = 1.0
 
 TEST_CACHES = {
     'default': {
@@ -1,11 +1,12 @@
 import logging
 
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from sorl.thumbnail.log import ThumbnailLogHandler
 
+from core.views import health, serve_media
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('admin/', admin.site.urls),
@@ -16,6 +17,7 @@ urlpatterns = [
     # Django пойдёт искать его в django.contrib.auth
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('health/', health, name='health'),
 ]
 
 handler404 = 'core.views.page_not_found'
@@ -28,6 +30,7 @@ logging.getLogger('sorl.thumbnail').addHandler(handler)
 
 # Эти строки — в самый конец файла:
 if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$',
+                serve_media),
+    ]